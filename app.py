@@ -1,29 +1,21 @@
+import logging
+import requests
 import streamlit as st
-from github_utils import download_parsers_from_github, upload_parsers_to_github
+from github_utils import download_parsers_from_github, upload_parsers_to_github, get_parser_registry
+from client_links import resolve_client_token, legacy_links_allowed
+from circuit_breaker import CircuitOpenError, unhealthy_breakers
 from parser_utils import add_new_parser, list_parsers
 from ocr_runner import run_parser
+from run_history import run_history
+from memory_utils import release_memory
 from urllib.parse import parse_qs
 
 # Ensure session state is initialized
 if 'parsers' not in st.session_state:
     st.session_state['parsers'] = {}
 
-def main():
-    # Set page config
-    st.set_page_config(page_title="FRACTO OCR Parser", layout="wide")
-
-    # Get URL parameters (e.g., parser and client flag)
-    query_params = st.experimental_get_query_params()
-    requested_parser = query_params.get("parser", [None])[0]
-    client_view = query_params.get("client", [False])[0]
-
-    # Ensure parsers are loaded once when the app starts
-    if 'loaded' not in st.session_state:
-        download_parsers_from_github()
-        st.session_state.loaded = True
-
-    # Add custom CSS for the sidebar radio buttons (styled similarly to the run parser page)
-    st.markdown("""
+# Sidebar styling, built once per process and reused by every session
+SIDEBAR_CSS = """
         <style>
         .stRadio [role=radiogroup] {
             display: flex;
@@ -53,18 +45,61 @@ def main():
             color: #FFFFFF;
         }
         </style>
-    """, unsafe_allow_html=True)
+    """
 
-    # Client View: Display the Run Parser page for a specific parser
-    if client_view and requested_parser:
-        if requested_parser in st.session_state['parsers']:
+# Show a status banner for every endpoint whose circuit breaker is not closed
+def show_health_banner():
+    for breaker in unhealthy_breakers():
+        st.warning(f"⚠️ {breaker.status_message()}")
+
+def main():
+    # Set page config
+    st.set_page_config(page_title="FRACTO OCR Parser", layout="wide")
+
+    # Get URL parameters (e.g., parser and client flag)
+    query_params = st.experimental_get_query_params()
+    requested_parser = query_params.get("parser", [None])[0]
+    client_view = query_params.get("client", [False])[0]
+    client_token = query_params.get("t", [None])[0]
+
+    # Client View: resolve the parser from the shared, cached registry and render a minimal page,
+    # without downloading the registry into this session
+    if client_token or (client_view and requested_parser):
+        if not client_token:
+            if not legacy_links_allowed():
+                st.error("This link format is no longer supported. Please ask for a new parser link.")
+                return
+            logging.warning(f"Deprecated unsigned client link used for parser '{requested_parser}'")
+        try:
+            if client_token:
+                requested_parser, parser_details = resolve_client_token(client_token)
+            else:
+                parser_details = get_parser_registry().get(requested_parser)
+        except (CircuitOpenError, requests.exceptions.RequestException):
+            show_health_banner()
+            st.error("The parser registry is temporarily unavailable. Please try again shortly.")
+            return
+        except RuntimeError as e:
+            st.error(f"Client links are not configured: {e}")
+            return
+        show_health_banner()
+        if parser_details:
             st.title(f"Run Parser: {requested_parser}")
-            parser_details = st.session_state['parsers'][requested_parser]
-            run_parser({requested_parser: parser_details})
+            run_parser({requested_parser: parser_details}, client_view=True)
         else:
             st.error("This parser no longer exists. Please contact support.")
         return
 
+    show_health_banner()
+
+    # Ensure parsers are loaded once when the app starts
+    if 'loaded' not in st.session_state:
+        download_parsers_from_github()
+        st.session_state.loaded = True
+
+    # Add custom CSS for the sidebar radio buttons (styled similarly to the run parser page)
+    st.markdown(SIDEBAR_CSS, unsafe_allow_html=True)
+
     # Internal Team View: Normal app with navigation
     st.title("📄 FRACTO OCR Parser Web App")
     
@@ -75,13 +110,18 @@ def main():
             <li>Add OCR parsers</li>
             <li>List existing parsers</li>
             <li>Run parsers on images</li>
+            <li>Search past OCR runs</li>
         </ul>
     """, unsafe_allow_html=True)
 
     # Radio button menu with custom style
-    menu = ["List Parsers", "Run Parser", "Add Parser"]
+    menu = ["List Parsers", "Run Parser", "Add Parser", "Run History"]
     choice = st.sidebar.radio("Menu", menu)
 
+    # Uploads only live on the Run Parser page; drop their memory reservation when leaving it
+    if choice != "Run Parser":
+        release_memory('uploads')
+
     # Menu options
     if choice == "Add Parser":
         add_new_parser()
@@ -89,6 +129,8 @@ def main():
         list_parsers()
     elif choice == "Run Parser":
         run_parser(st.session_state['parsers'])
+    elif choice == "Run History":
+        run_history(st.session_state['parsers'])
 
     st.sidebar.header("GitHub Actions")
     if st.sidebar.button("Download Parsers"):
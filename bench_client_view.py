@@ -0,0 +1,58 @@
+"""
+Benchmark client-view startup: the previous per-session path vs signed `?t=...` links.
+
+Each iteration starts a fresh AppTest session (like a new visitor) and times the first script run.
+The previous path downloaded the registry from GitHub in every session; it is reproduced by
+clearing the shared registry cache before each run.
+Needs `.streamlit/secrets.toml` with the GitHub token, API endpoint and `client_links.secret`;
+the previous path is only reachable with `client_links.allow_legacy_links = true`.
+`--github-api-url` points registry downloads at another contents-API server (e.g. a local mirror).
+
+Usage:
+    python bench_client_view.py "Kors Cheque Front" --runs 20
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from streamlit.testing.v1 import AppTest
+from client_links import make_client_token
+import github_utils
+from github_utils import get_parser_registry
+
+def time_first_run(query_params, runs, cold_registry=False):
+    timings = []
+    get_parser_registry()  # Warm the shared registry once, as a running server would have
+    for _ in range(runs):
+        if cold_registry:
+            get_parser_registry.clear()
+        at = AppTest.from_file("app.py", default_timeout=60)
+        for key, value in query_params.items():
+            at.query_params[key] = value
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return timings
+
+def report(label, timings):
+    print(f"{label}: median {statistics.median(timings) * 1000:.1f} ms, "
+          f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:.1f} ms over {len(timings)} sessions")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('parser_name')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--github-api-url', help="Contents API URL serving parsers.json (default: GitHub)")
+    args = parser.parse_args(argv)
+    if args.github_api_url:
+        github_utils.GITHUB_API_URL = args.github_api_url
+
+    report("Per-session registry download (previous path)",
+           time_first_run({'parser': args.parser_name, 'client': 'true'}, args.runs, cold_registry=True))
+    report("Signed link (?t=)", time_first_run({'t': make_client_token(args.parser_name)}, args.runs))
+
+if __name__ == "__main__":
+    sys.exit(main())
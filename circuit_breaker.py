@@ -0,0 +1,122 @@
+import time
+import logging
+import threading
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the endpoint's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint health tracking with a closed/open/half-open circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls fail fast.
+    Once `recovery_timeout` seconds have passed the circuit goes half-open and admits exactly
+    one real request; only that request succeeding closes it again. The optional `probe` is a
+    cheap pre-check run before the trial request: if it fails the circuit stays open, but if it
+    passes that is not taken as proof of recovery. A trial with no outcome after `trial_timeout`
+    seconds is treated as lost, so a caller that vanished mid-request can't wedge the circuit.
+    """
+
+    def __init__(self, name, failure_threshold=3, recovery_timeout=30, probe=None, trial_timeout=180):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.trial_timeout = trial_timeout
+        self.probe = probe
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.total_successes = 0
+        self.total_failures = 0
+        self.last_error = None
+        self.last_latency = None
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._trial_started_at = None
+        self._lock = threading.Lock()
+
+    def seconds_until_retry(self):
+        if self.state != OPEN:
+            return 0
+        return max(0, self.recovery_timeout - (time.time() - self.opened_at))
+
+    def allow_request(self):
+        """Return True if the caller may send a request; it must then record_success, record_failure or release."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if self.seconds_until_retry() > 0:
+                    return False
+                self.state = HALF_OPEN
+            if self._trial_in_flight and time.time() - self._trial_started_at < self.trial_timeout:
+                return False
+            # This caller's request is the single trial for the half-open circuit
+            self._trial_in_flight = True
+            self._trial_started_at = time.time()
+
+        if self.probe is not None:
+            try:
+                healthy = self.probe()
+                error = None if healthy else "health check failed"
+            except Exception as e:
+                healthy, error = False, str(e)
+            if not healthy:
+                self.record_failure(error)
+                return False
+        return True
+
+    def release(self):
+        """Give up an admitted request without an outcome (e.g. a local error), freeing the half-open trial slot."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self, latency=None):
+        with self._lock:
+            if self.state != CLOSED:
+                logging.info(f"Circuit '{self.name}' closed; endpoint recovered.")
+            self.state = CLOSED
+            self._trial_in_flight = False
+            self.consecutive_failures = 0
+            self.total_successes += 1
+            self.last_latency = latency
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._trial_in_flight = False
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            self.last_error = str(error) if error else self.last_error
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logging.warning(f"Circuit '{self.name}' opened after {self.consecutive_failures} failure(s): {self.last_error}")
+                self.state = OPEN
+                self.opened_at = time.time()
+
+    def status_message(self):
+        if self.state == OPEN:
+            return f"{self.name} is unavailable ({self.last_error}). Requests are paused; retrying in {self.seconds_until_retry():.0f}s."
+        if self.state == HALF_OPEN:
+            return f"{self.name} is recovering; checking whether it is reachable again."
+        return f"{self.name} is healthy."
+
+
+# Breakers are module-level so every session in the process shares the same endpoint health
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(key, name=None, **kwargs):
+    """Return the process-wide breaker for `key` (e.g. an endpoint URL); `name` is the label shown to users."""
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(name or key, **kwargs)
+        return _breakers[key]
+
+def unhealthy_breakers():
+    with _breakers_lock:
+        return [breaker for breaker in _breakers.values() if breaker.state != CLOSED]
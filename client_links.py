@@ -0,0 +1,44 @@
+import hmac
+import base64
+import hashlib
+import streamlit as st
+from github_utils import get_parser_registry
+
+CLIENT_APP_URL = "https://ocrtesting-csxcl7uybqbmwards96kjo.streamlit.app/"
+SIGNATURE_LENGTH = 16
+
+# A dedicated signing key: rotating it invalidates every shared link, so it must not double as another credential
+def _secret():
+    secret = st.secrets.get("client_links", {}).get("secret")
+    if not secret:
+        raise RuntimeError("`client_links.secret` is not configured in secrets; client links cannot be signed.")
+    return secret.encode('utf-8')
+
+# Unsigned `?parser=...&client=true` links are deprecated but still accepted so links already sent to clients
+# keep working; set `allow_legacy_links = false` once they have been replaced with signed links
+def legacy_links_allowed():
+    return bool(st.secrets.get("client_links", {}).get("allow_legacy_links", True))
+
+def _signature(payload):
+    return hmac.new(_secret(), payload.encode('utf-8'), hashlib.sha256).hexdigest()[:SIGNATURE_LENGTH]
+
+# Function to create a signed token that carries the parser name, so resolving it needs no registry scan
+def make_client_token(parser_name):
+    payload = base64.urlsafe_b64encode(parser_name.encode('utf-8')).decode('ascii').rstrip('=')
+    return f"{payload}.{_signature(payload)}"
+
+def make_client_link(parser_name):
+    return f"{CLIENT_APP_URL}?t={make_client_token(parser_name)}"
+
+# Function to verify a token and look the parser up in the shared registry; returns (name, details) or (None, None)
+def resolve_client_token(token):
+    payload, _, signature = (token or "").partition('.')
+    # Compare bytes: compare_digest rejects non-ASCII str, and the token comes straight from the URL
+    if not payload or not hmac.compare_digest(signature.encode('utf-8'), _signature(payload).encode('ascii')):
+        return None, None
+    try:
+        parser_name = base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)).decode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        return None, None
+    parser_details = get_parser_registry().get(parser_name)
+    return (parser_name, parser_details) if parser_details else (None, None)
@@ -0,0 +1,152 @@
+import io
+import threading
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+COMPARISON_COLUMNS = ['Attribute', 'Result with Extra Accuracy', 'Result without Extra Accuracy', 'Comparison']
+MISMATCH_COLUMNS = ['Field', 'Result with Extra Accuracy', 'Result without Extra Accuracy']
+
+
+class KeyDictionary:
+    """
+    Append-only mapping of flattened key paths to integer ids, shared by every document of a parser.
+
+    Flattened tables store only the int32 ids; the key strings live once in `dictionary()`.
+    Ids never change, so tables built against an older snapshot stay valid as new keys arrive.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._keys = []
+        self._snapshot = pa.array([], type=pa.string())
+        self._lock = threading.Lock()
+
+    def id_for(self, key):
+        key_id = self._ids.get(key)
+        if key_id is None:
+            with self._lock:
+                key_id = self._ids.get(key)
+                if key_id is None:
+                    key_id = len(self._keys)
+                    self._keys.append(key)
+                    self._ids[key] = key_id
+        return key_id
+
+    def dictionary(self):
+        with self._lock:
+            if len(self._snapshot) != len(self._keys):
+                self._snapshot = pa.array(self._keys, type=pa.string())
+            return self._snapshot
+
+    def __len__(self):
+        return len(self._keys)
+
+
+# One key dictionary per parser app, shared across sessions and documents.
+# Key paths include list indices, so a parser's dictionary only grows; once it holds MAX_KEYS
+# it is replaced by a fresh one. Tables keep working with the dictionary they were built against.
+MAX_KEYS = 100_000
+_key_dictionaries = {}
+_key_dictionaries_lock = threading.Lock()
+
+def get_key_dictionary(parser_app_id):
+    with _key_dictionaries_lock:
+        key_dictionary = _key_dictionaries.get(parser_app_id)
+        if key_dictionary is None or len(key_dictionary) >= MAX_KEYS:
+            key_dictionary = _key_dictionaries[parser_app_id] = KeyDictionary()
+        return key_dictionary
+
+# Function to walk a JSON response and yield (key_path, value) for every leaf, e.g. items__3__amount
+def iter_leaves(y, name=''):
+    if isinstance(y, dict):
+        for a in y:
+            yield from iter_leaves(y[a], f"{name}{a}__")
+    elif isinstance(y, list):
+        for i, a in enumerate(y):
+            # If the list items are dictionaries with a unique key, use it
+            if isinstance(a, dict) and 'Sr_No' in a:
+                yield from iter_leaves(a, f"{name}{a.get('Sr_No', i)}__")
+            else:
+                yield from iter_leaves(a, f"{name}{i}__")
+    else:
+        yield name[:-2], y  # Remove the trailing '__'
+
+# Function to flatten a JSON response straight into columns
+def flatten_to_table(y, key_dictionary):
+    """
+    Returns a table with `key_id` (int32), `value` (string, null for None) and `empty` (bool, True for
+    values the comparison treats as blank). A repeated key path keeps its last value, as flatten_json does.
+    """
+    positions = {}
+    key_ids = []
+    values = []
+    empties = []
+
+    for key, x in iter_leaves(y):
+        key_id = key_dictionary.id_for(key)
+        value = None if x is None else str(x)
+        if key_id in positions:
+            values[positions[key_id]] = value
+            empties[positions[key_id]] = not x
+        else:
+            positions[key_id] = len(key_ids)
+            key_ids.append(key_id)
+            values.append(value)
+            empties.append(not x)
+
+    return pa.table({
+        'key_id': pa.array(key_ids, type=pa.int32()),
+        'value': pa.array(values, type=pa.string()),
+        'empty': pa.array(empties, type=pa.bool_()),
+    })
+
+def _normalized(values, empty):
+    return pc.if_else(empty, "", pc.utf8_lower(pc.utf8_trim_whitespace(values)))
+
+# Function to compare two flattened tables column-wise; ocr_utils' comparison helpers all go through here
+def compare_tables(table1, table2, key_dictionary):
+    """
+    Returns a comparison table in table1's key order with a dictionary-encoded `Attribute` column
+    (holding only table1's keys), both values (missing values in table2 become "N/A") and a boolean
+    `match` column.
+    """
+    positions = pc.index_in(table1['key_id'], value_set=table2['key_id'])
+    present = pc.is_valid(positions)
+
+    values2 = pc.take(table2['value'], positions)
+    empty2 = pc.take(table2['empty'], positions)
+    norm1 = _normalized(table1['value'], table1['empty'])
+    norm2 = pc.if_else(present, _normalized(values2, pc.fill_null(empty2, False)), "n/a")
+    match = pc.fill_null(pc.equal(norm1, norm2), False)
+
+    # Re-encode against only the keys this table uses, not the parser's whole shared dictionary
+    attributes = pc.take(key_dictionary.dictionary(), table1['key_id']).combine_chunks().dictionary_encode()
+    return pa.table({
+        COMPARISON_COLUMNS[0]: attributes,
+        COMPARISON_COLUMNS[1]: table1['value'],
+        COMPARISON_COLUMNS[2]: pc.if_else(present, values2, "N/A"),
+        'match': match,
+    })
+
+# Function to render the comparison table with the ✔/✘ column the UI and exports use
+def with_comparison_marks(comparison_table):
+    marks = pc.if_else(comparison_table['match'], "✔", "✘")
+    return comparison_table.drop_columns(['match']).append_column(COMPARISON_COLUMNS[3], marks)
+
+# Function to keep only the mismatched rows, without materialising the matched ones
+def mismatch_table(comparison_table):
+    mismatches = comparison_table.filter(pc.invert(comparison_table['match']))
+    return mismatches.select(COMPARISON_COLUMNS[:3]).rename_columns(MISMATCH_COLUMNS)
+
+# Function to build the {key: "✔"/"✘"} mapping used by the JSON view and the run store
+def comparison_results_from_table(comparison_table):
+    keys = comparison_table[COMPARISON_COLUMNS[0]].combine_chunks().dictionary_decode().to_pylist()
+    matches = comparison_table['match'].to_pylist()
+    return {key: "✔" if match else "✘" for key, match in zip(keys, matches)}
+
+# Function to export a table to CSV bytes directly from its columns
+def table_to_csv(table):
+    sink = io.BytesIO()
+    pa_csv.write_csv(table, sink)
+    return sink.getvalue()
@@ -0,0 +1,70 @@
+import hashlib
+from PIL import Image
+
+NEAR_DUPLICATE_DISTANCE = 5
+
+# Function to hash file contents in chunks (SHA-256)
+def content_hash(file_path, chunk_size=64 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Function to compute a 64-bit difference hash, stable across re-scans and re-encodes of the same image
+def perceptual_hash(image_path, hash_size=8):
+    with Image.open(image_path) as image:
+        small = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = list(small.getdata())
+
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+def hamming_distance(hash1, hash2):
+    return bin(hash1 ^ hash2).count('1')
+
+# Function to collapse exact duplicates and flag near-duplicate images
+def deduplicate_files(file_paths, detect_near_duplicates=False, max_distance=NEAR_DUPLICATE_DISTANCE):
+    """
+    Returns (unique_paths, duplicates, near_duplicates, hashes):
+      - unique_paths: first occurrence of each distinct file content, in upload order
+      - duplicates: {duplicate_path: unique_path} for exact content matches
+      - near_duplicates: [(path, other_path, distance)] for visually similar images
+      - hashes: {unique_path: sha256}
+    """
+    unique_paths = []
+    duplicates = {}
+    hashes = {}
+    seen = {}
+
+    for file_path in file_paths:
+        digest = content_hash(file_path)
+        if digest in seen:
+            duplicates[file_path] = seen[digest]
+        else:
+            seen[digest] = file_path
+            hashes[file_path] = digest
+            unique_paths.append(file_path)
+
+    near_duplicates = []
+    if detect_near_duplicates:
+        phashes = []
+        for file_path in unique_paths:
+            if file_path.lower().endswith('.pdf'):
+                continue
+            try:
+                phashes.append((file_path, perceptual_hash(file_path)))
+            except Exception:
+                continue
+        for i, (path1, hash1) in enumerate(phashes):
+            for path2, hash2 in phashes[i + 1:]:
+                distance = hamming_distance(hash1, hash2)
+                if distance <= max_distance:
+                    near_duplicates.append((path1, path2, distance))
+
+    return unique_paths, duplicates, near_duplicates, hashes
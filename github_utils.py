@@ -5,6 +5,7 @@ import tempfile
 import logging
 import json
 import streamlit as st
+from circuit_breaker import get_breaker, CircuitOpenError
 
 GITHUB_REPO = 'ankuraeren/ocr'
 GITHUB_BRANCH = 'main'
@@ -14,6 +15,27 @@ GITHUB_API_URL = f'https://api.github.com/repos/{GITHUB_REPO}/contents/{GITHUB_F
 LOCAL_PARSERS_FILE = os.path.join(tempfile.gettempdir(), 'parsers.json')
 GITHUB_ACCESS_TOKEN = st.secrets["github"]["access_token"]
 
+GITHUB_BREAKER = get_breaker(
+    GITHUB_API_URL,
+    name="GitHub API",
+    probe=lambda: requests.head('https://api.github.com', timeout=5).status_code < 500
+)
+
+def github_request(method, **kwargs):
+    """Call the GitHub contents API through the shared circuit breaker; raises CircuitOpenError while it is open."""
+    if not GITHUB_BREAKER.allow_request():
+        raise CircuitOpenError(GITHUB_BREAKER.status_message())
+    try:
+        response = requests.request(method, GITHUB_API_URL, timeout=10, **kwargs)
+    except requests.exceptions.RequestException as e:
+        GITHUB_BREAKER.record_failure(e)
+        raise
+    if response.status_code >= 500:
+        GITHUB_BREAKER.record_failure(f"HTTP {response.status_code}")
+    else:
+        GITHUB_BREAKER.record_success(response.elapsed.total_seconds())
+    return response
+
 def load_parsers():
     """Load parsers from the local file and store them in session state."""
     if os.path.exists(LOCAL_PARSERS_FILE):
@@ -28,21 +50,44 @@ def load_parsers():
     else:
         st.error("`parsers.json` does not exist locally. Please download it from GitHub.")
 
-def download_parsers_from_github():
-    """Download the `parsers.json` from GitHub and save it locally."""
+def fetch_parsers_file_from_github():
+    """Fetch the raw `parsers.json` bytes from GitHub, or None if the file is empty."""
     headers = {'Authorization': f'token {GITHUB_ACCESS_TOKEN}'}
+    response = github_request('GET', headers=headers)
+    response.raise_for_status()
+    content = response.json().get('content')
+    return base64.b64decode(content) if content else None
+
+# Last registry fetched successfully, served when a refresh fails
+_last_good_registry = None
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def get_parser_registry():
+    """Process-wide parser registry shared by all sessions, refreshed from GitHub at most every 5 minutes."""
+    global _last_good_registry
     try:
-        response = requests.get(GITHUB_API_URL, headers=headers, timeout=10)
-        response.raise_for_status()
+        content = fetch_parsers_file_from_github()
+    except Exception as e:
+        if _last_good_registry is None:
+            raise
+        logging.warning(f"Parser registry refresh failed, serving the last good copy: {e}")
+        return _last_good_registry
+    _last_good_registry = json.loads(content) if content else {}
+    return _last_good_registry
 
-        content = response.json().get('content')
+def download_parsers_from_github():
+    """Download the `parsers.json` from GitHub and save it locally."""
+    try:
+        content = fetch_parsers_file_from_github()
         if content:
             with open(LOCAL_PARSERS_FILE, 'wb') as f:
-                f.write(base64.b64decode(content))
+                f.write(content)
             load_parsers()  # After downloading, load it into session state
             st.success("`parsers.json` downloaded successfully from GitHub.")
         else:
             st.error("`parsers.json` content is empty.")
+    except CircuitOpenError as e:
+        st.error(str(e))
     except requests.exceptions.RequestException as req_err:
         st.error(f"An error occurred while downloading `parsers.json`: {req_err}")
         logging.error(f"An error occurred while downloading `parsers.json`: {req_err}")
@@ -74,8 +119,9 @@ def upload_parsers_to_github():
             'sha': current_sha
         }
 
-        response = requests.put(GITHUB_API_URL, headers=headers, json=payload)
+        response = github_request('PUT', headers=headers, json=payload)
         if response.status_code in [200, 201]:
+            get_parser_registry.clear()  # Client links should see new, renamed and deleted parsers right away
             st.success("`parsers.json` uploaded successfully to GitHub.")
         else:
             st.error(f"Failed to upload `parsers.json`: {response.json().get('message', 'Unknown error')}")
@@ -86,7 +132,7 @@ def get_current_sha():
     """Retrieve the current SHA for the `parsers.json` file on GitHub."""
     headers = {'Authorization': f'token {GITHUB_ACCESS_TOKEN}'}
     try:
-        response = requests.get(GITHUB_API_URL, headers=headers, timeout=10)
+        response = github_request('GET', headers=headers)
         response.raise_for_status()
         sha = response.json().get('sha')
         return sha
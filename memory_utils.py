@@ -0,0 +1,141 @@
+import json
+import time
+import shutil
+import tempfile
+import threading
+import streamlit as st
+from PIL import Image
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+MB = 1024 * 1024
+PREVIEW_SIZE = (512, 512)
+SPILL_THRESHOLD_BYTES = 5 * MB
+# Parsed JSON (dicts, lists, str objects) takes several times the size of the raw response body
+JSON_MEMORY_FACTOR = 4
+DEFAULT_SESSION_LIMIT_MB = 256
+DEFAULT_PROCESS_LIMIT_MB = 1024
+
+# Process-wide accounting shared by all sessions: {session_id: {name: (bytes, last_updated)}}
+# Entries older than USAGE_TTL_SECONDS are dropped so abandoned sessions don't hold budget forever.
+USAGE_TTL_SECONDS = 3600
+_usage = {}
+_usage_lock = threading.Lock()
+
+def _limits():
+    limits = st.secrets.get("limits", {})
+    session_limit = limits.get("session_memory_mb", DEFAULT_SESSION_LIMIT_MB) * MB
+    process_limit = limits.get("process_memory_mb", DEFAULT_PROCESS_LIMIT_MB) * MB
+    return session_limit, process_limit
+
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else 'default'
+
+def _prune_expired(now):
+    for session_id in list(_usage):
+        session_usage = _usage[session_id]
+        for name in [n for n, (_, updated) in session_usage.items() if now - updated > USAGE_TTL_SECONDS]:
+            del session_usage[name]
+        if not session_usage:
+            del _usage[session_id]
+
+# Record an allocation for the current session; returns False (and records nothing) if it would exceed a limit
+def reserve_memory(name, nbytes):
+    session_limit, process_limit = _limits()
+    session_id = _session_id()
+    now = time.time()
+    with _usage_lock:
+        _prune_expired(now)
+        session_usage = _usage.get(session_id, {})
+        previous = session_usage.get(name, (0, now))[0]
+        session_total = sum(b for b, _ in session_usage.values()) - previous
+        process_total = sum(b for u in _usage.values() for b, _ in u.values()) - previous
+        if session_total + nbytes > session_limit or process_total + nbytes > process_limit:
+            return False
+        _usage.setdefault(session_id, {})[name] = (nbytes, now)
+        return True
+
+def release_memory(name=None):
+    """Release one named allocation, or everything held by the current session if `name` is None."""
+    session_id = _session_id()
+    with _usage_lock:
+        if name is None:
+            _usage.pop(session_id, None)
+        else:
+            _usage.get(session_id, {}).pop(name, None)
+
+def session_memory_usage():
+    with _usage_lock:
+        return sum(b for b, _ in _usage.get(_session_id(), {}).values())
+
+# Copy an uploaded file to disk in chunks instead of decoding or duplicating it in memory
+def save_upload_to_disk(uploaded_file, path):
+    uploaded_file.seek(0)
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(uploaded_file, f, 1 * MB)
+    uploaded_file.seek(0)
+
+# Build a small preview image; JPEG draft mode decodes at reduced scale directly
+def make_thumbnail(image_path, size=PREVIEW_SIZE):
+    with Image.open(image_path) as image:
+        image.draft('RGB', size)
+        image.thumbnail(size)
+        return image.copy()
+
+
+class SpooledResponse:
+    """
+    Minimal stand-in for a `requests.Response` whose body is held in a SpooledTemporaryFile.
+
+    The body stays in memory up to the spill threshold and rolls over to an anonymous temp file
+    beyond it. `size` is the body length, known before anything is parsed. `json()` parses the
+    body once and then closes the file, which deletes it.
+    """
+
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.size = body.tell()
+        self._body = body
+
+    @property
+    def text(self):
+        self._body.seek(0)
+        return self._body.read().decode('utf-8', errors='replace')
+
+    def json(self):
+        try:
+            self._body.seek(0)
+            return json.loads(self._body.read())
+        finally:
+            self.close()
+
+    def close(self):
+        self._body.close()
+
+# Keep large response bodies out of memory; expects a response requested with `stream=True`
+def spill_response(response, threshold=SPILL_THRESHOLD_BYTES):
+    if response is None:
+        return response
+    content_length = response.headers.get('Content-Length')
+    if content_length is not None and int(content_length) <= threshold:
+        response.content  # Known small body: read it into memory as usual
+        return response
+
+    # Unknown or large size: only bytes past the threshold ever touch the disk
+    body = tempfile.SpooledTemporaryFile(max_size=threshold)
+    try:
+        for chunk in response.iter_content(1 * MB):
+            body.write(chunk)
+    except Exception:
+        body.close()
+        raise
+    finally:
+        response.close()
+    return SpooledResponse(response.status_code, body, response.headers)
+
+# Size of a response body in bytes, without reading a spilled body back into memory
+def response_size(response):
+    if isinstance(response, SpooledResponse):
+        return response.size
+    return len(response.content)
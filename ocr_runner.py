@@ -1,21 +1,51 @@
 import os
+import json
 import tempfile
 import shutil
 import streamlit as st
-from PIL import Image
+from collections import OrderedDict
 from PyPDF2 import PdfReader
-from ocr_utils import send_request, generate_comparison_results, generate_comparison_df, generate_mismatch_df
+from ocr_utils import build_request, send_request, generate_comparison_table
+from columnar_utils import get_key_dictionary, comparison_results_from_table, mismatch_table, with_comparison_marks, table_to_csv
+from memory_utils import MB, SPILL_THRESHOLD_BYTES, JSON_MEMORY_FACTOR, response_size, reserve_memory, release_memory, save_upload_to_disk, make_thumbnail
+from dedup_utils import deduplicate_files
+from run_store import record_run, find_baseline_run, load_run
+from run_history import show_run_diff
 from st_aggrid import AgGrid, GridOptionsBuilder
 
-# Main OCR parser function
-def run_parser(parsers):
-    st.subheader("Run OCR Parser")
-    if not parsers:
-        st.info("No parsers available. Please add a parser first.")
-        return
+# Build a progress callback that shows upload progress and throughput in the UI
+def upload_progress(label):
+    progress_bar = st.progress(0.0, text=label)
+
+    def callback(bytes_sent, total_bytes, elapsed):
+        fraction = bytes_sent / total_bytes if total_bytes else 1.0
+        throughput = bytes_sent / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
+        progress_bar.progress(min(fraction, 1.0), text=f"{label}: {bytes_sent / (1024 * 1024):.1f} / {total_bytes / (1024 * 1024):.1f} MB ({throughput:.2f} MB/s)")
 
-    # Add custom CSS for horizontal, scrollable radio buttons
-    st.markdown("""
+    return callback
+
+# Number of recent batches per session whose run ids are kept for reuse
+RUN_CACHE_SIZE = 5
+
+# Read a response body as JSON; returns (json, None) or (None, error message)
+# The parsed response is reserved under `memory_name`; a response too large for the budget is not parsed at all
+def read_response_json(response, label, memory_name):
+    if response is None:
+        return None, f"Request {label} failed."
+    if response.status_code != 200:
+        return None, f"Request {label} failed. Status code: {response.status_code}"
+    size = response_size(response)
+    if not reserve_memory(memory_name, JSON_MEMORY_FACTOR * size):
+        response.close()
+        return None, (f"Response {label} ({size / MB:.1f} MB) is too large for the memory available to this session; "
+                      "it is not displayed or compared.")
+    try:
+        return response.json(), None
+    except json.JSONDecodeError:
+        return None, f"Failed to parse JSON response {label}."
+
+# Styling for the horizontal, scrollable parser selector
+PARSER_RADIO_CSS = """
         <style>
         .stRadio [role=radiogroup] {
             display: flex;
@@ -47,11 +77,26 @@ def run_parser(parsers):
             color: #FFFFFF;
         }
         </style>
-    """, unsafe_allow_html=True)
+    """
 
-    # Convert parser selection into horizontal scrollable radio buttons
-    parser_names = list(parsers.keys())
-    selected_parser = st.radio("Select Parser", parser_names)
+# Main OCR parser function
+def run_parser(parsers, client_view=False):
+    st.subheader("Run OCR Parser")
+    if not parsers:
+        st.info("No parsers available. Please add a parser first.")
+        return
+
+
+    # Client pages serve a single parser, so skip the selector and its styling
+    if client_view:
+        selected_parser = next(iter(parsers))
+    else:
+        # Add custom CSS for horizontal, scrollable radio buttons
+        st.markdown(PARSER_RADIO_CSS, unsafe_allow_html=True)
+
+        # Convert parser selection into horizontal scrollable radio buttons
+        parser_names = list(parsers.keys())
+        selected_parser = st.radio("Select Parser", parser_names)
     parser_info = parsers[selected_parser]
 
     st.write(f"**Selected Parser:** {selected_parser}")
@@ -63,6 +108,12 @@ def run_parser(parsers):
     # File uploader
     uploaded_files = st.file_uploader("Choose image or PDF file(s)...", type=["jpg", "jpeg", "png", "bmp", "gif", "tiff", "pdf"], accept_multiple_files=True)
     if uploaded_files:
+        # Uploaded bytes already live in memory; refuse the batch rather than risk running the process out of memory
+        upload_bytes = sum(uploaded_file.size for uploaded_file in uploaded_files)
+        if not reserve_memory('uploads', upload_bytes):
+            st.error(f"The uploaded files ({upload_bytes / MB:.1f} MB) exceed the memory available to this session. Please upload fewer or smaller files.")
+            return
+
         for uploaded_file in uploaded_files:
             try:
                 if uploaded_file.type == "application/pdf":
@@ -71,25 +122,27 @@ def run_parser(parsers):
                     temp_dirs.append(temp_dir)
                     pdf_path = os.path.join(temp_dir, uploaded_file.name)
 
-                    with open(pdf_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
+                    save_upload_to_disk(uploaded_file, pdf_path)
 
                     # Display PDF filename
                     st.markdown(f"**Uploaded PDF:** {uploaded_file.name}")
                     file_paths.append(pdf_path)
 
                 else:
-                    # Handle image files
-                    image = Image.open(uploaded_file)
-                    st.image(image, caption=uploaded_file.name, use_column_width=True)
+                    # Handle image files: keep the original bytes on disk and only decode a thumbnail for the preview
                     temp_dir = tempfile.mkdtemp()
                     temp_dirs.append(temp_dir)
                     image_path = os.path.join(temp_dir, uploaded_file.name)
-                    image.save(image_path)
+                    save_upload_to_disk(uploaded_file, image_path)
+                    st.image(make_thumbnail(image_path), caption=uploaded_file.name)
                     file_paths.append(image_path)
 
             except Exception as e:
                 st.error(f"Error processing file {uploaded_file.name}: {e}")
+    else:
+        release_memory('uploads')
+
+    detect_near_duplicates = st.checkbox("Flag near-duplicate images (re-scans)")
 
     # Run OCR button
     if st.button("Run OCR"):
@@ -97,83 +150,146 @@ def run_parser(parsers):
             st.error("Please provide at least one image or PDF.")
             return
 
-        headers = {
-            'x-api-key': parser_info['api_key'],
-        }
+        # Collapse identical documents into a single upload before calling the API
+        unique_paths, duplicates, near_duplicates, hashes = deduplicate_files(file_paths, detect_near_duplicates)
+        for duplicate_path, unique_path in duplicates.items():
+            st.info(f"{os.path.basename(duplicate_path)} is identical to {os.path.basename(unique_path)}; it will share its results.")
+        for path1, path2, distance in near_duplicates:
+            st.warning(f"{os.path.basename(path1)} and {os.path.basename(path2)} look like re-scans of the same document (distance {distance}).")
 
-        form_data = {
-            'parserApp': parser_info['parser_app_id'],
-            'user_ip': '127.0.0.1',
-            'location': 'delhi',
-            'user_agent': 'Dummy-device-testing11',
-        }
+        processed_documents = st.session_state.setdefault('processed_documents', {})
+        for unique_path, digest in hashes.items():
+            if digest in processed_documents:
+                st.info(f"{os.path.basename(unique_path)} was already processed earlier in this session as {processed_documents[digest]}.")
+        uploaded_paths = file_paths
+        file_paths = unique_paths
+
+        headers, form_data = build_request(parser_info)
 
         API_ENDPOINT = st.secrets["api"]["endpoint"]
 
-        with st.spinner("Processing OCR..."):
-            response_extra, time_taken_extra = send_request(file_paths, headers, form_data, True, API_ENDPOINT)
-            response_no_extra, time_taken_no_extra = send_request(file_paths, headers, form_data, False, API_ENDPOINT)
+        compress_pdf = st.secrets["api"].get("gzip_pdf", False)
 
-        # Cleanup temporary directories
-        for temp_dir in temp_dirs:
-            try:
-                shutil.rmtree(temp_dir)
-            except Exception as e:
-                st.warning(f"Could not remove temporary directory {temp_dir}: {e}")
+        # Reuse a stored run when this exact batch (same documents in the same order) already went through this
+        # parser. Only run ids are kept in the session; the responses themselves live in the run store.
+        run_cache = st.session_state.setdefault('ocr_run_cache', OrderedDict())
+        cache_key = (parser_info['parser_app_id'], tuple(hashes.values()))
+        cached_run = load_run(run_cache[cache_key]) if cache_key in run_cache else None
 
-        if response_extra and response_no_extra:
-            success_extra = response_extra.status_code == 200
-            success_no_extra = response_no_extra.status_code == 200
+        # Parsed responses are reserved while this run is displayed, compared and stored
+        try:
+            from_cache = cached_run is not None
+            if from_cache:
+                run_cache.move_to_end(cache_key)
+                st.info("These documents were already processed with this parser; reusing the previous results.")
+                response_json_extra, error_extra = cached_run['response_extra'], None
+                response_json_no_extra, error_no_extra = cached_run['response_no_extra'], None
+                time_taken_extra, time_taken_no_extra = cached_run['time_taken_extra'], cached_run['time_taken_no_extra']
+            else:
+                with st.spinner("Processing OCR..."):
+                    response_extra, time_taken_extra = send_request(file_paths, headers, form_data, True, API_ENDPOINT,
+                                                                    progress_callback=upload_progress("Uploading (Extra Accuracy)"),
+                                                                    compress_pdf=compress_pdf,
+                                                                    spill_threshold=SPILL_THRESHOLD_BYTES)
+                    response_no_extra, time_taken_no_extra = send_request(file_paths, headers, form_data, False, API_ENDPOINT,
+                                                                          progress_callback=upload_progress("Uploading (No Extra Accuracy)"),
+                                                                          compress_pdf=compress_pdf,
+                                                                          spill_threshold=SPILL_THRESHOLD_BYTES)
+                response_json_extra, error_extra = read_response_json(response_extra, "with Extra Accuracy", 'response_extra')
+                response_json_no_extra, error_no_extra = read_response_json(response_no_extra, "without Extra Accuracy",
+                                                                            'response_no_extra')
+
+            # Cleanup temporary directories
+            for temp_dir in temp_dirs:
+                try:
+                    shutil.rmtree(temp_dir)
+                except Exception as e:
+                    st.warning(f"Could not remove temporary directory {temp_dir}: {e}")
+
+            # The uploads have been sent and their disk copies removed; stop counting them against the budget
+            release_memory('uploads')
 
             # Display results in two columns
             col1, col2 = st.columns(2)
 
-            if success_extra:
-                try:
-                    response_json_extra = response_extra.json()
-                    with col1:
-                        st.expander(f"Results with Extra Accuracy - ⏱ {time_taken_extra:.2f}s").json(response_json_extra)
-                except json.JSONDecodeError:
-                    with col1:
-                        st.error("Failed to parse JSON response with Extra Accuracy.")
-            else:
-                with col1:
-                    st.error(f"Request with Extra Accuracy failed. Status code: {response_extra.status_code}")
+            with col1:
+                if error_extra:
+                    st.error(error_extra)
+                else:
+                    st.expander(f"Results with Extra Accuracy - ⏱ {time_taken_extra:.2f}s").json(response_json_extra)
 
-            if success_no_extra:
-                try:
-                    response_json_no_extra = response_no_extra.json()
-                    with col2:
-                        st.expander(f"Results without Extra Accuracy - ⏱ {time_taken_no_extra:.2f}s").json(response_json_no_extra)
-                except json.JSONDecodeError:
-                    with col2:
-                        st.error("Failed to parse JSON response without Extra Accuracy.")
-            else:
-                with col2:
-                    st.error(f"Request without Extra Accuracy failed. Status code: {response_no_extra.status_code}")
+            with col2:
+                if error_no_extra:
+                    st.error(error_no_extra)
+                else:
+                    st.expander(f"Results without Extra Accuracy - ⏱ {time_taken_no_extra:.2f}s").json(response_json_no_extra)
+
+            # Duplicates were sent once; show which results each uploaded file shares
+            if duplicates:
+                st.subheader("Uploaded Files")
+                st.dataframe({
+                    'Uploaded File': [os.path.basename(path) for path in uploaded_paths],
+                    'Results From': [os.path.basename(duplicates.get(path, path)) for path in uploaded_paths],
+                })
 
             # Generate comparison results
-            if success_extra and success_no_extra:
-                comparison_results = generate_comparison_results(response_json_extra, response_json_no_extra)
+            if error_extra or error_no_extra:
+                st.error("Comparison failed. One or both requests were unsuccessful.")
+                return
 
-                # Display mismatched fields in a table
-                st.subheader("Mismatched Fields")
-                mismatch_df = generate_mismatch_df(response_json_extra, response_json_no_extra, comparison_results)
-                st.dataframe(mismatch_df)
+            # Compare both responses as columns keyed by the parser's shared key dictionary
+            comparison_columns = generate_comparison_table(response_json_extra, response_json_no_extra,
+                                                           get_key_dictionary(parser_info['parser_app_id']))
+            comparison_results = comparison_results_from_table(comparison_columns)
 
-                # Display the comparison table
-                st.subheader("Comparison Table")
-                comparison_table = generate_comparison_df(response_json_extra, response_json_no_extra, comparison_results)
+            # Display mismatched fields in a table (Arrow tables are handed to Streamlit without conversion)
+            st.subheader("Mismatched Fields")
+            st.dataframe(mismatch_table(comparison_columns))
+
+            # Display the comparison table only if it fits in this session's memory budget
+            st.subheader("Comparison Table")
+            marked_columns = with_comparison_marks(comparison_columns)
+            st.download_button("Download Comparison CSV", table_to_csv(marked_columns),
+                               file_name="ocr_comparison.csv", mime="text/csv")
+            if reserve_memory('comparison_table', 4 * marked_columns.nbytes):
+                comparison_table = marked_columns.to_pandas()
                 gb = GridOptionsBuilder.from_dataframe(comparison_table)
                 gb.configure_pagination(paginationAutoPageSize=True)
                 gb.configure_side_bar()
                 gb.configure_selection('single')
                 grid_options = gb.build()
                 AgGrid(comparison_table, gridOptions=grid_options, height=500, theme='streamlit', enable_enterprise_modules=True)
+                del comparison_table
+                release_memory('comparison_table')
+            else:
+                st.warning("The full comparison table is too large for the available memory; showing mismatched fields only.")
 
-                # Display the full comparison JSON after the table
-                st.subheader("Comparison JSON")
-                st.expander("Comparison JSON").json(comparison_results)
+            # Display the full comparison JSON after the table
+            st.subheader("Comparison JSON")
+            st.expander("Comparison JSON").json(comparison_results)
 
-            else:
-                st.error("Comparison failed. One or both requests were unsuccessful.")
+            # Store the run and diff it against the previous run of this parser over the same documents.
+            # Client pages process external documents: they are never stored or shown other sessions' runs.
+            if not from_cache:
+                documents = {digest: os.path.basename(path) for path, digest in hashes.items()}
+                if not client_view:
+                    try:
+                        baseline_run_id = find_baseline_run(selected_parser, documents.keys())
+                        run_id = record_run(selected_parser, parser_info['parser_app_id'], documents,
+                                            response_json_extra, response_json_no_extra, comparison_results,
+                                            comparison_columns, time_taken_extra, time_taken_no_extra)
+                    except Exception as e:
+                        st.warning(f"Could not save this run to the run history: {e}")
+                    else:
+                        if baseline_run_id is not None:
+                            st.subheader("Changes Since Previous Run")
+                            show_run_diff(baseline_run_id, run_id)
+
+                        run_cache[cache_key] = run_id
+                        while len(run_cache) > RUN_CACHE_SIZE:
+                            run_cache.popitem(last=False)
+                for digest, name in documents.items():
+                    processed_documents.setdefault(digest, name)
+        finally:
+            release_memory('response_extra')
+            release_memory('response_no_extra')
@@ -4,122 +4,133 @@ import os
 import json
 import requests
 import time
-import pandas as pd
 import streamlit as st
+from upload_utils import StreamingMultipartEncoder
+from memory_utils import spill_response
+from circuit_breaker import get_breaker, CircuitOpenError
+from columnar_utils import (KeyDictionary, COMPARISON_COLUMNS, MISMATCH_COLUMNS, iter_leaves, flatten_to_table, compare_tables,
+                            comparison_results_from_table)
 
 # Function to flatten nested JSON with better handling of lists
 def flatten_json(y):
     out = {}
     order = []
+    for key, value in iter_leaves(y):
+        out[key] = value
+        order.append(key)
+    return out, order
 
-    def flatten(x, name=''):
-        if isinstance(x, dict):
-            for a in x:
-                flatten(x[a], f"{name}{a}__")
-        elif isinstance(x, list):
-            for i, a in enumerate(x):
-                # If the list items are dictionaries with a unique key, use it
-                if isinstance(a, dict) and 'Sr_No' in a:
-                    identifier = a.get('Sr_No', i)
-                    flatten(a, f"{name}{identifier}__")
-                else:
-                    flatten(a, f"{name}{i}__")
-        else:
-            out[name[:-2]] = x  # Remove the trailing '__'
-            order.append(name[:-2])
 
-    flatten(y)
-    return out, order
+# Function to compare two responses as Arrow columns; the single home of the comparison rule
+def generate_comparison_table(json1, json2, key_dictionary=None):
+    """
+    Returns `columnar_utils.compare_tables` output in json1's key order. Pass the parser's shared
+    `get_key_dictionary(...)` when comparing many documents; by default a throwaway one is used.
+    """
+    if key_dictionary is None:
+        key_dictionary = KeyDictionary()
+    return compare_tables(flatten_to_table(json1, key_dictionary), flatten_to_table(json2, key_dictionary), key_dictionary)
 
 
 # Function to generate comparison results (consistent string comparison)
 def generate_comparison_results(json1, json2):
-    flat_json1, order1 = flatten_json(json1)
-    flat_json2, _ = flatten_json(json2)
-
-    comparison_results = {}
-    for key in order1:
-        val1 = flat_json1.get(key, "N/A")
-        val2 = flat_json2.get(key, "N/A")
-
-        # Convert all values to strings for comparison
-        val1_str = str(val1).strip().lower() if val1 else ""
-        val2_str = str(val2).strip().lower() if val2 else ""
+    return comparison_results_from_table(generate_comparison_table(json1, json2))
 
-        match = (val1_str == val2_str)
-
-        comparison_results[key] = "✔" if match else "✘"
-    return comparison_results
-    
 
 # Function to generate a DataFrame for the comparison
 def generate_comparison_df(json1, json2, comparison_results):
-    flat_json1, order1 = flatten_json(json1)
-    flat_json2, _ = flatten_json(json2)
-
-    data = []
-    for key in order1:
-        val1 = flat_json1.get(key, "N/A")
-        val2 = flat_json2.get(key, "N/A")
-        match = comparison_results[key]
-        data.append([key, val1, val2, match])
-
-    df = pd.DataFrame(data, columns=['Attribute', 'Result with Extra Accuracy', 'Result without Extra Accuracy', 'Comparison'])
+    table = generate_comparison_table(json1, json2)
+    df = table.select(COMPARISON_COLUMNS[1:3]).to_pandas()
+    df.insert(0, COMPARISON_COLUMNS[0], table[COMPARISON_COLUMNS[0]].combine_chunks().dictionary_decode().to_pylist())
+    df[COMPARISON_COLUMNS[3]] = [comparison_results[key] for key in df[COMPARISON_COLUMNS[0]]]
     return df
 
 # Function to generate a DataFrame with only mismatched fields
 def generate_mismatch_df(json1, json2, comparison_results):
-    flat_json1, order1 = flatten_json(json1)
-    flat_json2, _ = flatten_json(json2)
-
-    data = []
-    for key in order1:
-        val1 = flat_json1.get(key, "N/A")
-        val2 = flat_json2.get(key, "N/A")
-        if comparison_results[key] == "✘":  # Only include mismatched fields
-            data.append([key, val1, val2])
-
-    # Create a DataFrame with only the mismatched fields
-    df = pd.DataFrame(data, columns=['Field', 'Result with Extra Accuracy', 'Result without Extra Accuracy'])
-    return df
+    df = generate_comparison_df(json1, json2, comparison_results)
+    df = df[df[COMPARISON_COLUMNS[3]] == "✘"].drop(columns=[COMPARISON_COLUMNS[3]])
+    return df.rename(columns=dict(zip(COMPARISON_COLUMNS[:3], MISMATCH_COLUMNS))).reset_index(drop=True)
+
+# Function to build the request headers and form data for a parser
+def build_request(parser_info):
+    headers = {
+        'x-api-key': parser_info['api_key'],
+    }
+
+    form_data = {
+        'parserApp': parser_info['parser_app_id'],
+        'user_ip': '127.0.0.1',
+        'location': 'delhi',
+        'user_agent': 'Dummy-device-testing11',
+    }
+    return headers, form_data
+
+# Function to get the process-wide circuit breaker for an OCR endpoint
+def ocr_breaker(API_ENDPOINT):
+    # The HEAD check only rules out an unreachable endpoint; the half-open trial POST decides recovery
+    return get_breaker(API_ENDPOINT, name="OCR service",
+                       probe=lambda: requests.head(API_ENDPOINT, timeout=5).status_code < 500)
 
 # Function to send OCR request
-def send_request(image_paths, headers, form_data, extra_accuracy, API_ENDPOINT):
+# With raise_errors=True (for callers without a Streamlit page, e.g. replay.py) failures are raised
+# instead of shown with st.error: CircuitOpenError, OSError for unreadable files, or the requests exception
+def send_request(image_paths, headers, form_data, extra_accuracy, API_ENDPOINT, progress_callback=None, compress_pdf=False, spill_threshold=None, raise_errors=False):
     local_headers = headers.copy()
     local_form_data = form_data.copy()
 
     if extra_accuracy:
         local_form_data['extra_accuracy'] = 'true'
 
-    # List of files to upload
-    files = []
-    for image_path in image_paths:
-        _, file_ext = os.path.splitext(image_path.lower())
-        mime_types = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.bmp': 'image/bmp',
-            '.gif': 'image/gif',
-            '.tiff': 'image/tiff',
-            '.pdf': 'application/pdf'
-        }
-        mime_type = mime_types.get(file_ext, 'application/octet-stream')
+    # Fail fast while the OCR endpoint is known to be down instead of waiting for the timeout
+    breaker = ocr_breaker(API_ENDPOINT)
+    if not breaker.allow_request():
+        if raise_errors:
+            raise CircuitOpenError(breaker.status_message())
+        st.error(breaker.status_message())
+        return None, 0
+
+    # Every admitted request must record an outcome or release the breaker slot. Local errors and Streamlit's
+    # RerunException/StopException (BaseExceptions raised from the progress callback when the user interacts
+    # mid-upload) say nothing about the endpoint, so they only release it.
+    outcome_recorded = False
+    encoder = None
+    try:
+        # Stream the multipart body from disk instead of buffering every file in memory
         try:
-            files.append(('file', (os.path.basename(image_path), open(image_path, 'rb'), mime_type)))
+            encoder = StreamingMultipartEncoder(local_form_data, image_paths, progress_callback=progress_callback, compress_pdf=compress_pdf)
         except Exception as e:
-            st.error(f"Error opening file {image_path}: {e}")
+            if raise_errors:
+                raise
+            st.error(f"Error opening files for upload: {e}")
             return None, 0
+        local_headers['Content-Type'] = encoder.content_type
 
-    try:
-        start_time = time.time()
-        response = requests.post(API_ENDPOINT, headers=local_headers, data=local_form_data, files=files if files else None, timeout=120)
-        time_taken = time.time() - start_time
+        try:
+            start_time = time.time()
+            if spill_threshold is None:
+                response = requests.post(API_ENDPOINT, headers=local_headers, data=encoder, timeout=120)
+            else:
+                # Large response bodies go straight to disk instead of being held in memory
+                response = requests.post(API_ENDPOINT, headers=local_headers, data=encoder, timeout=120, stream=True)
+                response = spill_response(response, spill_threshold)
+            time_taken = time.time() - start_time
+        except requests.exceptions.RequestException as e:
+            breaker.record_failure(e)
+            outcome_recorded = True
+            if raise_errors:
+                raise
+            st.error(f"Error in OCR request: {e}")
+            return None, 0
+
+        if response.status_code >= 500:
+            breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            breaker.record_success(time_taken)
+        outcome_recorded = True
         return response, time_taken
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error in OCR request: {e}")
-        return None, 0
     finally:
-        # Cleanup files
-        for _, file_tuple in files:
-            file_tuple[1].close()
+        if not outcome_recorded:
+            breaker.release()
+        # Cleanup any temporary compressed payloads
+        if encoder is not None:
+            encoder.close()
@@ -4,7 +4,7 @@ import requests
 import tempfile
 import logging
 import streamlit as st
-from urllib.parse import quote
+from client_links import make_client_link
 
 LOCAL_PARSERS_FILE = os.path.join(tempfile.gettempdir(), 'parsers.json')
 
@@ -65,15 +65,6 @@ def list_parsers():
         st.info("No parsers available. Please add a parser first.")
         return
 
-    # Count parser_app_id occurrences for dynamic numbering
-    app_id_count = {}
-    for parser_name, details in st.session_state['parsers'].items():
-        app_id = details['parser_app_id']
-        if app_id in app_id_count:
-            app_id_count[app_id] += 1
-        else:
-            app_id_count[app_id] = 1
-
     # Iterate over the parsers and display details
     for parser_name, details in st.session_state['parsers'].items():
         with st.expander(parser_name):
@@ -81,12 +72,13 @@ def list_parsers():
             st.write(f"**Parser App ID:** {details['parser_app_id']}")
             st.write(f"**Extra Accuracy:** {'Yes' if details['extra_accuracy'] else 'No'}")
 
-            app_id_num = app_id_count[details['parser_app_id']]  # Get the number associated with parser_app_id
-            parser_page_link = f"https://ocrtesting-csxcl7uybqbmwards96kjo.streamlit.app/?parser={quote(parser_name)}&client=true&id={app_id_num}"
-
             # Generate and display link button
             if st.button(f"Generate Parser Page for {parser_name}", key=f"generate_{parser_name}"):
-                st.write(f"**Parser Page Link:** [Click Here]({parser_page_link})")
+                try:
+                    parser_page_link = make_client_link(parser_name)
+                    st.write(f"**Parser Page Link:** [Click Here]({parser_page_link})")
+                except RuntimeError as e:
+                    st.error(str(e))
                 
             # Add Delete button
             if st.button(f"Delete {parser_name}", key=f"delete_{parser_name}"):
@@ -0,0 +1,227 @@
+"""
+Regression replay: re-run a saved corpus through a parser and report per-field drift against baselines.
+
+Corpus layout:
+    corpus/
+        cheque_001.jpg
+        statement_002.pdf
+        baselines/
+            cheque_001.jpg.json
+            statement_002.pdf.json
+
+Usage:
+    python replay.py corpus/ --parser "Kors Cheque Front" --endpoint https://.../upload-file-smart-ocr \\
+        --workers 8 --output drift.jsonl
+
+While the endpoint's circuit is open, replay pauses and resubmits the rejected documents once it
+recovers; it only gives up on them after an outage longer than --max-wait seconds.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from ocr_utils import build_request, send_request, generate_comparison_table, ocr_breaker
+from circuit_breaker import CircuitOpenError, CLOSED
+from columnar_utils import COMPARISON_COLUMNS, get_key_dictionary, comparison_results_from_table
+from upload_utils import MIME_TYPES
+
+BASELINE_DIR = 'baselines'
+DEFAULT_MAX_WAIT = 300
+# Pause between resubmissions while another request is the half-open trial
+RETRY_PAUSE = 1
+
+# Collapse list indices so the same field is aggregated across documents (items__3__amount -> items__*__amount)
+def field_pattern(key):
+    return re.sub(r'(^|__)\d+(?=__|$)', r'\1*', key)
+
+def load_corpus(corpus_dir):
+    """Yield (document_path, baseline_json) pairs for every document that has a baseline."""
+    baseline_dir = os.path.join(corpus_dir, BASELINE_DIR)
+    for name in sorted(os.listdir(corpus_dir)):
+        document_path = os.path.join(corpus_dir, name)
+        if not os.path.isfile(document_path) or os.path.splitext(name.lower())[1] not in MIME_TYPES:
+            continue
+        baseline_path = os.path.join(baseline_dir, f"{name}.json")
+        if not os.path.exists(baseline_path):
+            print(f"Skipping {name}: no baseline at {baseline_path}", file=sys.stderr)
+            continue
+        with open(baseline_path, 'r') as f:
+            yield document_path, json.load(f)
+
+# Function to re-run one document and compare it with its baseline using the app's comparison logic
+def replay_document(document_path, baseline_json, parser_info, endpoint, extra_accuracy):
+    headers, form_data = build_request(parser_info)
+    result = {'document': os.path.basename(document_path)}
+    try:
+        response, result['time_taken'] = send_request([document_path], headers, form_data, extra_accuracy, endpoint,
+                                                      raise_errors=True)
+    except CircuitOpenError:
+        # Not a result for this document: replay_corpus waits for the endpoint and resubmits it
+        raise
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        return result
+
+    if response.status_code != 200:
+        result['error'] = f"HTTP {response.status_code}: {response.text[:200]}"
+        return result
+    try:
+        new_json = response.json()
+    except ValueError:
+        result['error'] = "invalid JSON response"
+        return result
+
+    # Compare with the app's rule, sharing the parser's key dictionary across the whole corpus;
+    # the reverse comparison lists the new response's keys, so fields the baseline lacked show up too
+    key_dictionary = get_key_dictionary(parser_info['parser_app_id'])
+    comparison_results = comparison_results_from_table(generate_comparison_table(baseline_json, new_json, key_dictionary))
+    new_keys = generate_comparison_table(new_json, baseline_json, key_dictionary)[COMPARISON_COLUMNS[0]]
+    result['changed'] = [key for key, match in comparison_results.items() if match == "✘"]
+    result['added'] = [key for key in new_keys.to_pylist() if key not in comparison_results]
+    result['compared'] = list(comparison_results)
+    return result
+
+
+class DriftReport:
+    """Per-field drift counters updated as each document finishes."""
+
+    def __init__(self):
+        self.documents = 0
+        self.drifted_documents = 0
+        self.failures = 0
+        self.failure_causes = Counter()
+        self.field_totals = Counter()
+        self.field_changes = Counter()
+
+    def add(self, result):
+        self.documents += 1
+        if 'error' in result:
+            self.failures += 1
+            self.failure_causes[result['error'].split(':', 1)[0]] += 1
+            return
+        if result['changed'] or result['added']:
+            self.drifted_documents += 1
+        self.field_totals.update(field_pattern(key) for key in result['compared'])
+        self.field_totals.update(field_pattern(key) for key in result['added'])
+        self.field_changes.update(field_pattern(key) for key in result['changed'] + result['added'])
+
+    def summary(self, top=20):
+        lines = [f"{self.documents} documents, {self.drifted_documents} with drift, {self.failures} failed"]
+        for cause, count in self.failure_causes.most_common():
+            lines.append(f"  failed with {cause}: {count}")
+        for field, changes in self.field_changes.most_common(top):
+            total = self.field_totals[field]
+            lines.append(f"  {field}: {changes}/{total} changed ({changes / total:.1%})")
+        return "\n".join(lines)
+
+
+def replay_corpus(corpus, parser_info, endpoint, extra_accuracy, workers=4, max_wait=DEFAULT_MAX_WAIT):
+    """
+    Replay `corpus` (an iterable of (path, baseline_json)) with at most `workers` requests in flight
+    and yield each result as soon as it finishes, so a report can be built incrementally.
+
+    Documents rejected by the open circuit are not results: feeding pauses until the breaker admits
+    requests again and they are resubmitted. Once an outage has lasted `max_wait` seconds, the
+    rejected documents are reported as failed.
+    """
+    corpus = iter(corpus)
+    breaker = ocr_breaker(endpoint)
+    rejected = deque()
+    outage_waited = 0.0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+
+        def submit(item):
+            pending[executor.submit(replay_document, *item, parser_info, endpoint, extra_accuracy)] = item
+
+        while True:
+            if rejected and outage_waited >= max_wait:
+                # The outage outlasted max_wait: report what it rejected and carry on with the corpus
+                while rejected:
+                    yield {'document': os.path.basename(rejected.popleft()[0]),
+                           'error': f"CircuitOpenError: endpoint still unavailable after {outage_waited:.0f}s"}
+            if rejected:
+                # The circuit opened: wait until it admits a trial request, then resubmit what it rejected
+                if breaker.state != CLOSED:
+                    pause = min(max(breaker.seconds_until_retry(), RETRY_PAUSE), max_wait - outage_waited)
+                    time.sleep(pause)
+                    outage_waited += pause
+                while rejected and len(pending) < workers:
+                    submit(rejected.popleft())
+            else:
+                # Only keep `workers` documents in flight so large corpora are read lazily
+                while len(pending) < workers:
+                    item = next(corpus, None)
+                    if item is None:
+                        break
+                    submit(item)
+
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    result = future.result()
+                except CircuitOpenError:
+                    rejected.append(item)
+                    continue
+                if 'error' not in result:
+                    outage_waited = 0.0  # The endpoint answered; a later outage gets its own budget
+                yield result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a saved corpus through a parser and report per-field drift.")
+    parser.add_argument('corpus', help="Directory with documents and a baselines/ subdirectory of <document>.json responses")
+    parser.add_argument('--parser', required=True, help="Parser name as stored in parsers.json")
+    parser.add_argument('--parsers-file', default='parsers.json')
+    parser.add_argument('--endpoint', default=os.environ.get('OCR_API_ENDPOINT'), help="OCR API endpoint (default: $OCR_API_ENDPOINT)")
+    parser.add_argument('--extra-accuracy', choices=['parser', 'on', 'off'], default='parser',
+                        help="Extra accuracy mode used for the baselines (default: the parser's setting)")
+    parser.add_argument('--workers', type=int, default=4, help="Maximum concurrent OCR requests")
+    parser.add_argument('--output', help="Write one JSON line per document to this file as results arrive")
+    parser.add_argument('--max-wait', type=float, default=DEFAULT_MAX_WAIT,
+                        help="Seconds to wait for an unavailable endpoint before failing the documents it rejected")
+    parser.add_argument('--summary-every', type=int, default=50, help="Print the running drift summary every N documents")
+    args = parser.parse_args(argv)
+
+    if not args.endpoint:
+        parser.error("--endpoint is required (or set OCR_API_ENDPOINT)")
+    with open(args.parsers_file, 'r') as f:
+        parsers = json.load(f)
+    if args.parser not in parsers:
+        parser.error(f"Parser '{args.parser}' not found in {args.parsers_file}")
+    parser_info = parsers[args.parser]
+    extra_accuracy = parser_info['extra_accuracy'] if args.extra_accuracy == 'parser' else args.extra_accuracy == 'on'
+
+    report = DriftReport()
+    output = open(args.output, 'w') if args.output else None
+    start_time = time.time()
+    try:
+        for result in replay_corpus(load_corpus(args.corpus), parser_info, args.endpoint, extra_accuracy, args.workers,
+                                    args.max_wait):
+            report.add(result)
+            if output:
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+            status = result.get('error') or f"{len(result['changed'])} changed, {len(result['added'])} added"
+            print(f"[{report.documents}] {result['document']}: {status}")
+            if report.documents % args.summary_every == 0:
+                print(report.summary())
+    finally:
+        if output:
+            output.close()
+
+    print(f"\nReplay finished in {time.time() - start_time:.1f}s")
+    print(report.summary())
+    return 1 if report.drifted_documents or report.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
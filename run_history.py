@@ -0,0 +1,57 @@
+import pandas as pd
+import streamlit as st
+from run_store import find_runs, load_run, diff_runs
+
+# Display the per-field differences between two stored runs
+def show_run_diff(baseline_run_id, run_id):
+    rows = diff_runs(baseline_run_id, run_id)
+    if not rows:
+        st.success(f"No fields changed compared to run #{baseline_run_id}.")
+        return
+    diff_df = pd.DataFrame(rows, columns=['Field', 'Baseline with Extra Accuracy', 'Current with Extra Accuracy',
+                                          'Baseline without Extra Accuracy', 'Current without Extra Accuracy'])
+    st.write(f"**{len(rows)} field(s) changed compared to run #{baseline_run_id}:**")
+    st.dataframe(diff_df)
+
+# Run History page: search past OCR runs and compare them without calling the API again
+def run_history(parsers):
+    st.subheader("Run History")
+
+    with st.form("run_history_search"):
+        col1, col2, col3 = st.columns(3)
+        parser_name = col1.selectbox("Parser", ["All"] + list(parsers.keys()))
+        date_from = col2.date_input("From", value=None)
+        date_to = col3.date_input("To", value=None)
+        col4, col5, col6 = st.columns(3)
+        document_hash = col4.text_input("Document Hash (SHA-256)").strip()
+        field = col5.text_input("Field").strip()
+        value = col6.text_input("Field Value (with Extra Accuracy)").strip()
+        st.form_submit_button("Search")
+
+    runs = find_runs(
+        parser_name=None if parser_name == "All" else parser_name,
+        date_from=date_from,
+        date_to=date_to,
+        document_hash=document_hash or None,
+        field=field or None,
+        value=value or None,
+    )
+    if not runs:
+        st.info("No stored runs match these filters.")
+        return
+
+    st.dataframe(pd.DataFrame(runs))
+
+    run_ids = [run['id'] for run in runs]
+    selected_run_id = st.selectbox("Show Run", run_ids)
+    run = load_run(selected_run_id)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.expander(f"Results with Extra Accuracy - ⏱ {run['time_taken_extra']:.2f}s").json(run['response_extra'])
+    with col2:
+        st.expander(f"Results without Extra Accuracy - ⏱ {run['time_taken_no_extra']:.2f}s").json(run['response_no_extra'])
+    st.expander("Comparison JSON").json(run['comparison'])
+
+    baseline_run_id = st.selectbox("Compare Against Run", [None] + [r for r in run_ids if r != selected_run_id])
+    if baseline_run_id is not None:
+        show_run_diff(baseline_run_id, selected_run_id)
@@ -0,0 +1,234 @@
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+import streamlit as st
+from datetime import datetime, timedelta, timezone
+from columnar_utils import COMPARISON_COLUMNS
+
+# Configure under [run_store] in secrets: `path` should point at a persistent volume in production
+DEFAULT_RUN_STORE_FILE = os.path.join(tempfile.gettempdir(), 'ocr_runs.sqlite')
+DEFAULT_RETENTION_DAYS = 30
+DEFAULT_MAX_RUNS = 2000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    parser_name TEXT NOT NULL,
+    parser_app_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    created_date TEXT NOT NULL,
+    documents_key TEXT NOT NULL,
+    response_extra TEXT,
+    response_no_extra TEXT,
+    comparison TEXT,
+    time_taken_extra REAL,
+    time_taken_no_extra REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_parser_date ON runs (parser_name, created_date);
+CREATE INDEX IF NOT EXISTS idx_runs_created ON runs (created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_documents ON runs (parser_name, documents_key, created_at);
+
+CREATE TABLE IF NOT EXISTS run_documents (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    document_hash TEXT NOT NULL,
+    document_name TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_run_documents_hash ON run_documents (document_hash);
+CREATE INDEX IF NOT EXISTS idx_run_documents_run ON run_documents (run_id);
+
+CREATE TABLE IF NOT EXISTS run_fields (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    field TEXT NOT NULL,
+    value_extra TEXT,
+    value_no_extra TEXT,
+    match INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_run_fields_run ON run_fields (run_id);
+CREATE INDEX IF NOT EXISTS idx_run_fields_field_value ON run_fields (field, value_extra);
+CREATE INDEX IF NOT EXISTS idx_run_fields_value ON run_fields (value_extra);
+"""
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+def _settings():
+    return st.secrets.get("run_store", {})
+
+# Fill in the retention settings the caller didn't pass; secrets are only read when needed,
+# so scripts and tests that pass `path` and both settings can use the store without them
+def _retention_policy(retention_days=None, max_runs=None):
+    if retention_days is None or max_runs is None:
+        settings = _settings()
+        retention_days = retention_days or settings.get("retention_days", DEFAULT_RETENTION_DAYS)
+        max_runs = max_runs or settings.get("max_runs", DEFAULT_MAX_RUNS)
+    return retention_days, max_runs
+
+def run_store_path():
+    return _settings().get("path", DEFAULT_RUN_STORE_FILE)
+
+def _connect(path=None):
+    path = path or run_store_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    with _init_lock:
+        if path not in _initialized:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(_SCHEMA)
+            _initialized.add(path)
+    return conn
+
+# A key for a batch of documents; order is kept because one multi-file request (e.g. statement pages) is order-dependent
+def documents_key(document_hashes):
+    return ",".join(document_hashes)
+
+# Function to store one OCR run (inputs, both responses, comparison and timings)
+def record_run(parser_name, parser_app_id, documents, response_json_extra, response_json_no_extra,
+               comparison_results, comparison_columns, time_taken_extra, time_taken_no_extra, path=None,
+               retention_days=None, max_runs=None):
+    """
+    `documents` maps document hash -> file name; `comparison_columns` is the Arrow table from
+    `columnar_utils.compare_tables`. Returns the new run id.
+    """
+    now = datetime.now(timezone.utc)
+    fields = comparison_columns.select(COMPARISON_COLUMNS[:3] + ['match']).to_pydict()
+    retention_days, max_runs = _retention_policy(retention_days, max_runs)
+
+    conn = _connect(path)
+    try:
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (parser_name, parser_app_id, created_at, created_date, documents_key, "
+                "response_extra, response_no_extra, comparison, time_taken_extra, time_taken_no_extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (parser_name, parser_app_id, now.isoformat(), now.date().isoformat(), documents_key(documents),
+                 json.dumps(response_json_extra), json.dumps(response_json_no_extra), json.dumps(comparison_results),
+                 time_taken_extra, time_taken_no_extra)
+            )
+            run_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO run_documents (run_id, document_hash, document_name) VALUES (?, ?, ?)",
+                [(run_id, digest, name) for digest, name in documents.items()]
+            )
+            conn.executemany(
+                "INSERT INTO run_fields (run_id, field, value_extra, value_no_extra, match) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, key, value_extra, value_no_extra, int(match))
+                 for key, value_extra, value_no_extra, match in zip(*fields.values())]
+            )
+            _prune(conn, retention_days, max_runs)
+        return run_id
+    finally:
+        conn.close()
+
+def _prune(conn, retention_days, max_runs):
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).isoformat()
+    # Documents and fields go with their run through ON DELETE CASCADE
+    conn.execute("DELETE FROM runs WHERE created_at < ?", (cutoff,))
+    conn.execute("DELETE FROM runs WHERE id NOT IN (SELECT id FROM runs ORDER BY created_at DESC, id DESC LIMIT ?)", (max_runs,))
+
+# Function to apply the retention policy: drop runs older than `retention_days` and keep at most `max_runs`
+def prune_runs(retention_days=None, max_runs=None, path=None):
+    retention_days, max_runs = _retention_policy(retention_days, max_runs)
+    conn = _connect(path)
+    try:
+        with conn:
+            _prune(conn, retention_days, max_runs)
+    finally:
+        conn.close()
+
+# Function to search past runs; every filter is optional and served by an index
+def find_runs(parser_name=None, date_from=None, date_to=None, document_hash=None, field=None, value=None,
+              limit=100, path=None):
+    clauses = []
+    params = []
+    if parser_name:
+        clauses.append("r.parser_name = ?")
+        params.append(parser_name)
+    if date_from:
+        clauses.append("r.created_date >= ?")
+        params.append(str(date_from))
+    if date_to:
+        clauses.append("r.created_date <= ?")
+        params.append(str(date_to))
+    if document_hash:
+        clauses.append("r.id IN (SELECT run_id FROM run_documents WHERE document_hash = ?)")
+        params.append(document_hash)
+    if field and value is not None:
+        clauses.append("r.id IN (SELECT run_id FROM run_fields WHERE field = ? AND value_extra = ?)")
+        params.extend([field, str(value)])
+    elif field:
+        clauses.append("r.id IN (SELECT run_id FROM run_fields WHERE field = ?)")
+        params.append(field)
+    elif value is not None:
+        clauses.append("r.id IN (SELECT run_id FROM run_fields WHERE value_extra = ?)")
+        params.append(str(value))
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    query = (
+        "SELECT r.id, r.parser_name, r.parser_app_id, r.created_at, r.time_taken_extra, r.time_taken_no_extra, "
+        "(SELECT group_concat(document_name, ', ') FROM run_documents d WHERE d.run_id = r.id) AS documents, "
+        "(SELECT count(*) FROM run_fields f WHERE f.run_id = r.id AND f.match = 0) AS mismatches "
+        f"FROM runs r {where} ORDER BY r.created_at DESC, r.id DESC LIMIT ?"
+    )
+    params.append(limit)
+
+    conn = _connect(path)
+    try:
+        return [dict(row) for row in conn.execute(query, params)]
+    finally:
+        conn.close()
+
+# Function to load a stored run with its responses and comparison
+def load_run(run_id, path=None):
+    conn = _connect(path)
+    try:
+        row = conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        run = dict(row)
+        for column in ('response_extra', 'response_no_extra', 'comparison'):
+            run[column] = json.loads(run[column]) if run[column] else None
+        run['documents'] = {r['document_hash']: r['document_name'] for r in
+                            conn.execute("SELECT document_hash, document_name FROM run_documents WHERE run_id = ?", (run_id,))}
+        return run
+    finally:
+        conn.close()
+
+def load_run_fields(run_id, path=None):
+    conn = _connect(path)
+    try:
+        rows = conn.execute("SELECT field, value_extra, value_no_extra FROM run_fields WHERE run_id = ?", (run_id,))
+        return {row['field']: (row['value_extra'], row['value_no_extra']) for row in rows}
+    finally:
+        conn.close()
+
+# Function to find the most recent earlier run of a parser over the same set of documents
+def find_baseline_run(parser_name, document_hashes, before_run_id=None, path=None):
+    query = "SELECT id FROM runs WHERE parser_name = ? AND documents_key = ?"
+    params = [parser_name, documents_key(document_hashes)]
+    if before_run_id is not None:
+        query += " AND id < ?"
+        params.append(before_run_id)
+    query += " ORDER BY created_at DESC, id DESC LIMIT 1"
+
+    conn = _connect(path)
+    try:
+        row = conn.execute(query, params).fetchone()
+        return row['id'] if row else None
+    finally:
+        conn.close()
+
+# Function to diff two stored runs field by field (both accuracy modes)
+def diff_runs(baseline_run_id, run_id, path=None):
+    baseline = load_run_fields(baseline_run_id, path)
+    current = load_run_fields(run_id, path)
+    rows = []
+    for field in list(baseline) + [f for f in current if f not in baseline]:
+        old_extra, old_no_extra = baseline.get(field, (None, None))
+        new_extra, new_no_extra = current.get(field, (None, None))
+        if old_extra != new_extra or old_no_extra != new_no_extra:
+            rows.append([field, old_extra, new_extra, old_no_extra, new_no_extra])
+    return rows
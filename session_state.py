@@ -3,6 +3,7 @@
 import streamlit as st
 import pandas as pd
 import logging
+from collections import OrderedDict
 
 # Configure logging
 logging.basicConfig(
@@ -59,6 +60,15 @@ def initialize_session_state():
         st.session_state['time_taken_no_extra'] = None
         logging.info("Initialized 'time_taken_no_extra' in session_state.")
     
+    # Deduplication
+    if 'processed_documents' not in st.session_state:
+        st.session_state['processed_documents'] = {}
+        logging.info("Initialized 'processed_documents' in session_state.")
+    
+    if 'ocr_run_cache' not in st.session_state:
+        st.session_state['ocr_run_cache'] = OrderedDict()
+        logging.info("Initialized 'ocr_run_cache' in session_state.")
+    
     # Comparison Results
     if 'comparison_results' not in st.session_state:
         st.session_state['comparison_results'] = {}
@@ -123,6 +133,8 @@ def initialize_session_state():
         st.session_state['response_no_extra'] = None
         st.session_state['time_taken_extra'] = None
         st.session_state['time_taken_no_extra'] = None
+        st.session_state['processed_documents'] = {}
+        st.session_state['ocr_run_cache'] = OrderedDict()
         st.session_state['comparison_results'] = {}
         st.session_state['comparison_table'] = pd.DataFrame()
         st.session_state['mismatch_df'] = pd.DataFrame()
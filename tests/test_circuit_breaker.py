@@ -0,0 +1,126 @@
+import pytest
+
+import ocr_utils
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN, get_breaker
+
+
+def open_breaker(recovery_timeout=0, probe=None):
+    breaker = CircuitBreaker('ocr', failure_threshold=3, recovery_timeout=recovery_timeout, probe=probe)
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure('timeout')
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_opens_after_consecutive_failures_only():
+    breaker = CircuitBreaker('ocr', failure_threshold=3)
+    breaker.record_failure('timeout')
+    breaker.record_failure('timeout')
+    breaker.record_success()
+    breaker.record_failure('timeout')
+    assert breaker.state == CLOSED
+    breaker.record_failure('timeout')
+    breaker.record_failure('timeout')
+    assert breaker.state == OPEN
+
+
+def test_fails_fast_while_open():
+    breaker = open_breaker(recovery_timeout=60)
+    assert not breaker.allow_request()
+    assert breaker.seconds_until_retry() > 0
+    assert 'timeout' in breaker.status_message()
+
+
+def test_half_open_admits_exactly_one_trial():
+    breaker = open_breaker()
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_trial_success_closes():
+    breaker = open_breaker()
+    assert breaker.allow_request()
+    breaker.record_success(1.2)
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0
+    assert breaker.allow_request()
+
+
+def test_trial_failure_reopens():
+    breaker = open_breaker(recovery_timeout=60)
+    breaker.opened_at -= 60
+    assert breaker.allow_request()
+    breaker.record_failure('timeout')
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_passing_probe_does_not_close_the_circuit():
+    breaker = open_breaker(probe=lambda: True)
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+
+
+def test_failing_probe_keeps_circuit_open_without_a_trial():
+    def probe():
+        raise ConnectionError('refused')
+
+    breaker = open_breaker(recovery_timeout=60, probe=probe)
+    breaker.opened_at -= 60
+    assert not breaker.allow_request()
+    assert breaker.state == OPEN
+    assert breaker.last_error == 'refused'
+
+
+def test_release_frees_trial_slot_without_an_outcome():
+    breaker = open_breaker()
+    assert breaker.allow_request()
+    successes, failures = breaker.total_successes, breaker.total_failures
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert (breaker.total_successes, breaker.total_failures) == (successes, failures)
+    assert breaker.allow_request()
+
+
+def test_lost_trial_is_replaced_after_trial_timeout(monkeypatch):
+    breaker = open_breaker()
+    breaker.trial_timeout = 60
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    started = breaker._trial_started_at
+    monkeypatch.setattr('circuit_breaker.time.time', lambda: started + 61)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+class Interrupted(BaseException):
+    """Stands in for Streamlit's RerunException/StopException, which are not Exceptions."""
+
+
+@pytest.mark.parametrize('error', [Interrupted(), ValueError('bad Content-Length')])
+def test_send_request_releases_trial_when_interrupted(monkeypatch, tmp_path, error):
+    breaker = open_breaker()
+    monkeypatch.setattr(ocr_utils, 'ocr_breaker', lambda endpoint: breaker)
+
+    def post(*args, **kwargs):
+        raise error
+    monkeypatch.setattr(ocr_utils.requests, 'post', post)
+
+    document = tmp_path / 'cheque.jpg'
+    document.write_bytes(b'jpeg')
+    with pytest.raises(type(error)):
+        ocr_utils.send_request([str(document)], {}, {}, False, 'https://ocr.example', raise_errors=True)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+@pytest.mark.parametrize('endpoint', ['https://a.example/ocr', 'https://b.example/ocr'])
+def test_breakers_are_per_key(endpoint):
+    breaker = get_breaker(endpoint, name='OCR service')
+    assert breaker is get_breaker(endpoint)
+    assert breaker is not get_breaker(endpoint + '/other')
+    assert breaker.name == 'OCR service'
@@ -0,0 +1,65 @@
+import sys
+import types
+import importlib
+
+import pytest
+
+REGISTRY = {'Kors Cheque Front': {'parser_app_id': 'app-1'}, 'Statement ü': {'parser_app_id': 'app-2'}}
+
+
+@pytest.fixture
+def client_links(monkeypatch):
+    # github_utils reads the GitHub token from secrets at import; the links only need the registry lookup
+    monkeypatch.setitem(sys.modules, 'github_utils', types.SimpleNamespace(get_parser_registry=lambda: REGISTRY))
+    monkeypatch.delitem(sys.modules, 'client_links', raising=False)
+    module = importlib.import_module('client_links')
+    monkeypatch.setattr(module, 'st', types.SimpleNamespace(secrets={'client_links': {'secret': 'test-secret'}}))
+    yield module
+    sys.modules.pop('client_links', None)
+
+
+@pytest.mark.parametrize('parser_name', list(REGISTRY))
+def test_round_trip(client_links, parser_name):
+    token = client_links.make_client_token(parser_name)
+    assert client_links.resolve_client_token(token) == (parser_name, REGISTRY[parser_name])
+    assert client_links.make_client_link(parser_name).endswith(f"?t={token}")
+
+
+def test_unknown_parser_resolves_to_nothing(client_links):
+    assert client_links.resolve_client_token(client_links.make_client_token('Deleted parser')) == (None, None)
+
+
+def test_tampered_signature_is_rejected(client_links):
+    payload, _, signature = client_links.make_client_token('Kors Cheque Front').partition('.')
+    tampered = signature[:-1] + ('0' if signature[-1] != '0' else '1')
+    assert client_links.resolve_client_token(f"{payload}.{tampered}") == (None, None)
+    assert client_links.resolve_client_token(payload) == (None, None)
+
+
+def test_token_signed_with_another_secret_is_rejected(client_links, monkeypatch):
+    token = client_links.make_client_token('Kors Cheque Front')
+    monkeypatch.setattr(client_links, 'st', types.SimpleNamespace(secrets={'client_links': {'secret': 'rotated'}}))
+    assert client_links.resolve_client_token(token) == (None, None)
+
+
+@pytest.mark.parametrize('token', ['', '.', 'UA.éééé', 'éé.0123456789abcdef', '%%%.abc', None])
+def test_malformed_tokens_are_rejected(client_links, token):
+    assert client_links.resolve_client_token(token) == (None, None)
+
+
+def test_bad_base64_with_valid_signature_is_rejected(client_links):
+    payload = 'A'  # A single base64 character can never decode
+    assert client_links.resolve_client_token(f"{payload}.{client_links._signature(payload)}") == (None, None)
+
+
+def test_missing_secret_raises(client_links, monkeypatch):
+    monkeypatch.setattr(client_links, 'st', types.SimpleNamespace(secrets={'github': {'access_token': 'token'}}))
+    with pytest.raises(RuntimeError, match='client_links.secret'):
+        client_links.make_client_token('Kors Cheque Front')
+
+
+def test_legacy_links_are_accepted_unless_disabled(client_links, monkeypatch):
+    assert client_links.legacy_links_allowed()
+    monkeypatch.setattr(client_links, 'st', types.SimpleNamespace(
+        secrets={'client_links': {'secret': 'test-secret', 'allow_legacy_links': False}}))
+    assert not client_links.legacy_links_allowed()
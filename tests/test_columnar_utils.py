@@ -0,0 +1,132 @@
+import random
+
+import columnar_utils
+from columnar_utils import KeyDictionary, COMPARISON_COLUMNS, flatten_to_table, compare_tables, get_key_dictionary
+from ocr_utils import flatten_json, generate_comparison_results, generate_comparison_table, generate_mismatch_df
+
+
+# Frozen copy of the original flatten_json, so the shared traversal is checked against it rather than itself
+def reference_flatten(y):
+    out = {}
+    order = []
+
+    def flatten(x, name=''):
+        if isinstance(x, dict):
+            for a in x:
+                flatten(x[a], f"{name}{a}__")
+        elif isinstance(x, list):
+            for i, a in enumerate(x):
+                if isinstance(a, dict) and 'Sr_No' in a:
+                    identifier = a.get('Sr_No', i)
+                    flatten(a, f"{name}{identifier}__")
+                else:
+                    flatten(a, f"{name}{i}__")
+        else:
+            out[name[:-2]] = x
+            order.append(name[:-2])
+
+    flatten(y)
+    return out, order
+
+
+# The row-by-row rule generate_comparison_results used before it moved onto Arrow columns
+def reference_comparison(json1, json2):
+    flat_json1, order1 = reference_flatten(json1)
+    flat_json2, _ = reference_flatten(json2)
+    results = {}
+    for key in order1:
+        val1 = flat_json1.get(key, "N/A")
+        val2 = flat_json2.get(key, "N/A")
+        val1_str = str(val1).strip().lower() if val1 else ""
+        val2_str = str(val2).strip().lower() if val2 else ""
+        results[key] = "✔" if val1_str == val2_str else "✘"
+    return results
+
+
+LEAVES = [None, "", " ", 0, 0.0, 1, 1.5, True, False, "N/A", "n/a ", "Total", " total", "TOTAL", "12,345.00", "ß"]
+
+def random_response(rng, depth=0):
+    response = {}
+    for i in range(rng.randint(1, 5)):
+        key = rng.choice(["amount", "date", "name", "items", f"field_{i}"])
+        roll = rng.random()
+        if depth < 3 and roll < 0.2:
+            response[key] = random_response(rng, depth + 1)
+        elif depth < 3 and roll < 0.35:
+            response[key] = [random_response(rng, depth + 1) if rng.random() < 0.5 else rng.choice(LEAVES)
+                             for _ in range(rng.randint(0, 3))]
+            if response[key] and isinstance(response[key][0], dict) and rng.random() < 0.5:
+                response[key][0]['Sr_No'] = rng.choice([1, 2, "A"])
+        else:
+            response[key] = rng.choice(LEAVES)
+    return response
+
+def mutate(rng, response):
+    mutated = {}
+    for key, value in response.items():
+        roll = rng.random()
+        if roll < 0.1:
+            continue
+        if isinstance(value, dict):
+            mutated[key] = mutate(rng, value)
+        elif roll < 0.3 and not isinstance(value, list):
+            mutated[key] = rng.choice(LEAVES)
+        else:
+            mutated[key] = value
+    if rng.random() < 0.3:
+        mutated['extra'] = rng.choice(LEAVES)
+    return mutated
+
+
+def test_matches_reference_comparison_on_random_responses():
+    rng = random.Random(1234)
+    key_dictionary = KeyDictionary()
+    for _ in range(500):
+        json1 = random_response(rng)
+        json2 = mutate(rng, json1) if rng.random() < 0.8 else random_response(rng)
+        assert flatten_json(json1) == reference_flatten(json1)
+        expected = reference_comparison(json1, json2)
+        assert generate_comparison_results(json1, json2) == expected
+        table = generate_comparison_table(json1, json2, key_dictionary)
+        assert dict(zip(table[COMPARISON_COLUMNS[0]].to_pylist(),
+                        ["✔" if m else "✘" for m in table['match'].to_pylist()])) == expected
+
+
+def test_missing_values_show_as_na():
+    json1 = {'a': 'x', 'b': 'N/A', 'c': None}
+    table = generate_comparison_table(json1, {'a': ' X '})
+    assert table[COMPARISON_COLUMNS[2]].to_pylist() == [' X ', 'N/A', 'N/A']
+    assert table['match'].to_pylist() == [True, True, False]
+
+
+def test_mismatch_df_lists_only_mismatches():
+    json1 = {'a': 'x', 'b': 'y'}
+    json2 = {'a': 'x', 'b': 'z'}
+    df = generate_mismatch_df(json1, json2, generate_comparison_results(json1, json2))
+    assert df.values.tolist() == [['b', 'y', 'z']]
+
+
+def test_attribute_dictionary_holds_only_used_keys():
+    key_dictionary = KeyDictionary()
+    for i in range(1000):
+        key_dictionary.id_for(f"unrelated_{i}")
+    json1 = {'a': 1, 'b': {'c': 2}}
+    table = compare_tables(flatten_to_table(json1, key_dictionary), flatten_to_table({'a': 1}, key_dictionary),
+                           key_dictionary)
+    attributes = table[COMPARISON_COLUMNS[0]].combine_chunks()
+    assert attributes.dictionary.to_pylist() == ['a', 'b__c']
+    assert attributes.to_pylist() == ['a', 'b__c']
+
+
+def test_key_dictionary_is_replaced_once_full(monkeypatch):
+    monkeypatch.setattr(columnar_utils, 'MAX_KEYS', 3)
+    full = get_key_dictionary('test-parser')
+    for key in ('a', 'b'):
+        full.id_for(key)
+    assert get_key_dictionary('test-parser') is full
+    full.id_for('c')
+    fresh = get_key_dictionary('test-parser')
+    assert fresh is not full and len(fresh) == 0
+    # Tables built against the old dictionary still resolve their keys
+    table = flatten_to_table({'a': 1, 'c': 2}, full)
+    assert compare_tables(table, table, full)[COMPARISON_COLUMNS[0]].to_pylist() == ['a', 'c']
@@ -0,0 +1,85 @@
+import shutil
+
+import pytest
+from PIL import Image, ImageDraw
+
+from dedup_utils import deduplicate_files, perceptual_hash, hamming_distance, NEAR_DUPLICATE_DISTANCE
+
+
+def draw_document(path, size=(400, 250), invert=False):
+    """A cheque-like test image: a light background with dark text bars and a box."""
+    background, ink = ((30, 30, 30), (235, 235, 235)) if invert else ((235, 235, 235), (30, 30, 30))
+    image = Image.new('RGB', size, background)
+    draw = ImageDraw.Draw(image)
+    width, height = size
+    draw.rectangle([width * 0.05, height * 0.1, width * 0.6, height * 0.2], fill=ink)
+    draw.rectangle([width * 0.05, height * 0.4, width * 0.9, height * 0.47], fill=ink)
+    draw.rectangle([width * 0.65, height * 0.65, width * 0.95, height * 0.9], outline=ink, width=4)
+    image.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def documents(tmp_path):
+    original = draw_document(tmp_path / 'cheque.png')
+    with Image.open(original) as image:
+        image.save(tmp_path / 'cheque_rescan.jpg', quality=70)
+        image.resize((380, 237)).save(tmp_path / 'cheque_scaled.png')
+    return {
+        'original': original,
+        'copy': shutil.copy(original, tmp_path / 'cheque_copy.png'),
+        'rescan': str(tmp_path / 'cheque_rescan.jpg'),
+        'scaled': str(tmp_path / 'cheque_scaled.png'),
+        'other': draw_document(tmp_path / 'statement.png', invert=True),
+    }
+
+
+def test_exact_duplicates_collapse_in_upload_order(documents):
+    paths = [documents['other'], documents['original'], documents['copy'], documents['rescan']]
+    unique_paths, duplicates, near_duplicates, hashes = deduplicate_files(paths)
+
+    assert unique_paths == [documents['other'], documents['original'], documents['rescan']]
+    assert duplicates == {documents['copy']: documents['original']}
+    assert list(hashes) == unique_paths
+    assert len(set(hashes.values())) == 3
+    assert near_duplicates == []
+
+
+def test_reencoded_and_scaled_copies_are_near_duplicates(documents):
+    original = perceptual_hash(documents['original'])
+    assert hamming_distance(original, perceptual_hash(documents['rescan'])) <= NEAR_DUPLICATE_DISTANCE
+    assert hamming_distance(original, perceptual_hash(documents['scaled'])) <= NEAR_DUPLICATE_DISTANCE
+    assert hamming_distance(original, perceptual_hash(documents['other'])) > NEAR_DUPLICATE_DISTANCE
+
+
+def test_near_duplicates_are_flagged_not_collapsed(documents):
+    paths = [documents['original'], documents['rescan'], documents['scaled'], documents['other']]
+    unique_paths, duplicates, near_duplicates, _ = deduplicate_files(paths, detect_near_duplicates=True)
+
+    assert unique_paths == paths
+    assert duplicates == {}
+    flagged = {frozenset((path1, path2)) for path1, path2, _ in near_duplicates}
+    assert flagged == {
+        frozenset((documents['original'], documents['rescan'])),
+        frozenset((documents['original'], documents['scaled'])),
+        frozenset((documents['rescan'], documents['scaled'])),
+    }
+    assert all(distance <= NEAR_DUPLICATE_DISTANCE for _, _, distance in near_duplicates)
+
+
+def test_pdfs_are_deduplicated_but_never_perceptually_hashed(tmp_path, documents, monkeypatch):
+    pdf = tmp_path / 'statement.pdf'
+    pdf.write_bytes(b'%PDF-1.4\n% statement\n%%EOF\n')
+    pdf_copy = shutil.copy(pdf, tmp_path / 'statement_copy.PDF')
+    other_pdf = tmp_path / 'other.pdf'
+    other_pdf.write_bytes(b'%PDF-1.4\n% other\n%%EOF\n')
+
+    hashed = []
+    monkeypatch.setattr('dedup_utils.perceptual_hash', lambda path: hashed.append(path) or 0)
+    paths = [str(pdf), str(pdf_copy), str(other_pdf), documents['original']]
+    unique_paths, duplicates, near_duplicates, _ = deduplicate_files(paths, detect_near_duplicates=True)
+
+    assert unique_paths == [str(pdf), str(other_pdf), documents['original']]
+    assert duplicates == {str(pdf_copy): str(pdf)}
+    assert hashed == [documents['original']]
+    assert near_duplicates == []
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+import memory_utils
+import ocr_runner
+from memory_utils import MB, SpooledResponse, spill_response, response_size
+
+
+class StreamedResponse:
+    """Enough of a `requests.Response` opened with stream=True for spill_response."""
+
+    def __init__(self, body, content_length=None):
+        self.status_code = 200
+        self.headers = {} if content_length is None else {'Content-Length': str(content_length)}
+        self._body = body
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self._body), chunk_size):
+            yield self._body[start:start + chunk_size]
+
+    @property
+    def content(self):
+        return self._body
+
+    def json(self):
+        return json.loads(self._body)
+
+    def close(self):
+        self.closed = True
+
+
+def json_body(size):
+    return json.dumps({'text': 'x' * size}).encode('utf-8')
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(memory_utils, '_limits', lambda: (2 * MB, 8 * MB))
+    yield
+    memory_utils.release_memory()
+
+
+def test_unknown_length_body_is_spooled_with_its_size():
+    body = json_body(3 * MB)
+    response = spill_response(StreamedResponse(body), threshold=1 * MB)
+    assert isinstance(response, SpooledResponse)
+    assert response_size(response) == len(body)
+    assert response.headers == {}
+    assert response.json() == json.loads(body)
+
+
+def test_known_small_body_stays_a_regular_response():
+    body = json_body(100)
+    streamed = StreamedResponse(body, content_length=len(body))
+    assert spill_response(streamed, threshold=1 * MB) is streamed
+    assert response_size(streamed) == len(body)
+
+
+def test_response_within_budget_is_parsed_and_reserved(limits):
+    body = json_body(100 * 1024)
+    response_json, error = ocr_runner.read_response_json(StreamedResponse(body), "A", 'response_a')
+    assert error is None and response_json == json.loads(body)
+    assert memory_utils.session_memory_usage() == memory_utils.JSON_MEMORY_FACTOR * len(body)
+
+
+def test_response_over_budget_is_not_parsed(limits):
+    response = spill_response(StreamedResponse(json_body(1 * MB)), threshold=256 * 1024)
+    response_json, error = ocr_runner.read_response_json(response, "A", 'response_a')
+    assert response_json is None
+    assert 'too large' in error
+    assert response._body.closed
+    assert memory_utils.session_memory_usage() == 0
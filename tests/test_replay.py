@@ -0,0 +1,50 @@
+import time
+
+import replay
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def fake_endpoint(monkeypatch, down_for):
+    """Patch replay so documents go through a breaker guarding an endpoint that refuses for `down_for` seconds."""
+    breaker = CircuitBreaker('OCR service', failure_threshold=3, recovery_timeout=0.05)
+    up_at = time.time() + down_for
+    monkeypatch.setattr(replay, 'ocr_breaker', lambda endpoint: breaker)
+    monkeypatch.setattr(replay, 'RETRY_PAUSE', 0.01)
+
+    def replay_document(document_path, baseline_json, parser_info, endpoint, extra_accuracy):
+        if not breaker.allow_request():
+            raise CircuitOpenError(breaker.status_message())
+        if time.time() < up_at:
+            breaker.record_failure('connection refused')
+            return {'document': document_path, 'error': 'ConnectionError: connection refused'}
+        breaker.record_success()
+        return {'document': document_path, 'changed': [], 'added': [], 'compared': ['a']}
+
+    monkeypatch.setattr(replay, 'replay_document', replay_document)
+    return breaker
+
+
+def corpus(count):
+    return [(f"doc_{i}.jpg", {'a': 1}) for i in range(count)]
+
+
+def test_documents_rejected_by_open_circuit_are_resubmitted(monkeypatch):
+    fake_endpoint(monkeypatch, down_for=0.2)
+    results = list(replay.replay_corpus(corpus(50), {}, 'https://ocr.example', True, workers=4, max_wait=5))
+
+    assert sorted(r['document'] for r in results) == sorted(path for path, _ in corpus(50))
+    errors = [r['error'] for r in results if 'error' in r]
+    assert not any(error.startswith('CircuitOpenError') for error in errors)
+    # Only the requests that actually reached the refusing endpoint failed
+    assert len(errors) < 10
+
+
+def test_gives_up_after_max_wait(monkeypatch):
+    fake_endpoint(monkeypatch, down_for=60)
+    start = time.time()
+    results = list(replay.replay_corpus(corpus(20), {}, 'https://ocr.example', True, workers=4, max_wait=0.3))
+
+    assert time.time() - start < 5
+    assert len(results) == 20
+    assert all('error' in r for r in results)
+    assert any(r['error'].startswith('CircuitOpenError') for r in results)
@@ -0,0 +1,81 @@
+import pytest
+
+import run_store
+from ocr_utils import generate_comparison_table
+from columnar_utils import comparison_results_from_table
+
+PARSER = 'Kors Cheque Front'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / 'runs' / 'ocr_runs.sqlite')
+
+
+def record(store, documents, response_extra, response_no_extra, parser_name=PARSER, max_runs=100):
+    comparison_columns = generate_comparison_table(response_extra, response_no_extra)
+    return run_store.record_run(parser_name, 'app-1', documents, response_extra, response_no_extra,
+                                comparison_results_from_table(comparison_columns), comparison_columns, 1.5, 0.5,
+                                path=store, retention_days=30, max_runs=max_runs)
+
+
+def test_record_and_load_run(store):
+    run_id = record(store, {'hash-a': 'a.jpg'}, {'amount': '100', 'payee': 'ACME'}, {'amount': '100', 'payee': 'Acme Ltd'})
+    run = run_store.load_run(run_id, path=store)
+    assert run['parser_name'] == PARSER
+    assert run['documents'] == {'hash-a': 'a.jpg'}
+    assert run['response_no_extra'] == {'amount': '100', 'payee': 'Acme Ltd'}
+    assert run['comparison'] == {'amount': '✔', 'payee': '✘'}
+    assert run_store.load_run_fields(run_id, path=store) == {'amount': ('100', '100'), 'payee': ('ACME', 'Acme Ltd')}
+    assert run_store.load_run(run_id + 1, path=store) is None
+
+
+def test_find_runs_by_document_hash_and_field_value(store):
+    run_a = record(store, {'hash-a': 'a.jpg'}, {'amount': '100'}, {'amount': '100'})
+    run_b = record(store, {'hash-b': 'b.jpg', 'hash-a': 'a.jpg'}, {'amount': '250'}, {'amount': '205'})
+    record(store, {'hash-c': 'c.jpg'}, {'date': '2024-01-01'}, {'date': '2024-01-01'}, parser_name='Other')
+
+    def ids(**filters):
+        return [run['id'] for run in run_store.find_runs(path=store, **filters)]
+
+    assert ids(document_hash='hash-a') == [run_b, run_a]
+    assert ids(document_hash='hash-b') == [run_b]
+    assert ids(field='amount', value='250') == [run_b]
+    assert ids(field='amount') == [run_b, run_a]
+    assert ids(value=100) == [run_a]
+    assert ids(field='amount', value='999') == []
+    assert len(ids(parser_name='Other')) == 1
+
+    (summary,) = run_store.find_runs(document_hash='hash-b', path=store)
+    assert summary['mismatches'] == 1
+    assert set(summary['documents'].split(', ')) == {'a.jpg', 'b.jpg'}
+
+
+def test_find_baseline_run_matches_the_same_ordered_batch(store):
+    first = record(store, {'hash-a': 'a.jpg', 'hash-b': 'b.jpg'}, {'amount': '100'}, {'amount': '100'})
+    record(store, {'hash-b': 'b.jpg', 'hash-a': 'a.jpg'}, {'amount': '100'}, {'amount': '100'})
+    second = record(store, {'hash-a': 'a.jpg', 'hash-b': 'b.jpg'}, {'amount': '100'}, {'amount': '100'})
+
+    assert run_store.find_baseline_run(PARSER, ['hash-a', 'hash-b'], path=store) == second
+    assert run_store.find_baseline_run(PARSER, ['hash-a', 'hash-b'], before_run_id=second, path=store) == first
+    assert run_store.find_baseline_run(PARSER, ['hash-a'], path=store) is None
+    assert run_store.find_baseline_run('Other', ['hash-a', 'hash-b'], path=store) is None
+
+
+def test_diff_runs_lists_changed_added_and_removed_fields(store):
+    baseline = record(store, {'hash-a': 'a.jpg'}, {'amount': '100', 'payee': 'ACME', 'memo': 'rent'},
+                      {'amount': '100', 'payee': 'ACME', 'memo': 'rent'})
+    current = record(store, {'hash-a': 'a.jpg'}, {'amount': '100', 'payee': 'ACME LTD', 'date': '2024-01-01'},
+                     {'amount': '100', 'payee': 'ACME', 'date': '2024-01-01'})
+    assert run_store.diff_runs(baseline, current, path=store) == [
+        ['payee', 'ACME', 'ACME LTD', 'ACME', 'ACME'],
+        ['memo', 'rent', None, 'rent', None],
+        ['date', None, '2024-01-01', None, '2024-01-01'],
+    ]
+
+
+def test_record_run_keeps_at_most_max_runs(store):
+    run_ids = [record(store, {f'hash-{i}': f'{i}.jpg'}, {'amount': str(i)}, {'amount': str(i)}, max_runs=2)
+               for i in range(4)]
+    assert [run['id'] for run in run_store.find_runs(path=store)] == run_ids[:1:-1]
+    assert run_store.load_run_fields(run_ids[0], path=store) == {}
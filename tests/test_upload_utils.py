@@ -0,0 +1,96 @@
+import os
+import gzip
+import glob
+import tempfile
+from email.parser import BytesParser
+from email.policy import HTTP
+
+import pytest
+
+from upload_utils import StreamingMultipartEncoder, GZIP_FORM_FIELD
+
+
+def read_all(encoder, block_size=8192):
+    body = b''
+    while True:
+        data = encoder.read(block_size)
+        if not data:
+            return body
+        body += data
+
+
+def parse_parts(encoder, body):
+    message = BytesParser(policy=HTTP).parsebytes(
+        f'Content-Type: {encoder.content_type}\r\n\r\n'.encode('utf-8') + body
+    )
+    return list(message.iter_parts())
+
+
+@pytest.fixture
+def files(tmp_path):
+    pdf = tmp_path / 'statement.pdf'
+    pdf.write_bytes(b'%PDF-1.4 ' + os.urandom(200_000))
+    png = tmp_path / 'cheque.png'
+    png.write_bytes(os.urandom(50_000))
+    return str(pdf), str(png)
+
+
+def test_length_matches_body_and_layout(files):
+    encoder = StreamingMultipartEncoder({'parserApp': 'abc', 'location': 'delhi'}, files, chunk_size=4096)
+    body = read_all(encoder)
+    encoder.close()
+
+    assert len(body) == len(encoder)
+    assert body.endswith(f'--{encoder.boundary}--\r\n'.encode('utf-8'))
+
+    parts = parse_parts(encoder, body)
+    assert [p.get_param('name', header='content-disposition') for p in parts] == ['parserApp', 'location', 'file', 'file']
+    assert parts[0].get_payload(decode=True) == b'abc'
+    assert parts[2].get_filename() == 'statement.pdf'
+    assert parts[2].get_content_type() == 'application/pdf'
+    with open(files[0], 'rb') as f:
+        assert parts[2].get_payload(decode=True) == f.read()
+    assert parts[3].get_content_type() == 'image/png'
+
+
+def test_filename_is_escaped(tmp_path):
+    path = tmp_path / 'bad"name\r\nX-Injected: 1.png'
+    path.write_bytes(b'img')
+    encoder = StreamingMultipartEncoder({}, [str(path)])
+    body = read_all(encoder)
+
+    assert b'\r\nX-Injected' not in body
+    assert b'filename="bad%22name%0D%0AX-Injected: 1.png"' in body
+
+
+def test_compressed_pdf_contract(files):
+    encoder = StreamingMultipartEncoder({'parserApp': 'abc'}, files, compress_pdf=True)
+    body = read_all(encoder)
+    temp_files = list(encoder._temp_files)
+    encoder.close()
+
+    assert len(body) == len(encoder)
+    parts = {p.get_filename() or p.get_param('name', header='content-disposition'): p for p in parse_parts(encoder, body)}
+    assert parts[GZIP_FORM_FIELD].get_payload(decode=True) == b'gzip'
+    assert parts['statement.pdf.gz'].get_content_type() == 'application/gzip'
+    with open(files[0], 'rb') as f:
+        assert gzip.decompress(parts['statement.pdf.gz'].get_payload(decode=True)) == f.read()
+    assert parts['cheque.png'].get_content_type() == 'image/png'
+    assert not any(os.path.exists(p) for p in temp_files)
+
+
+def test_temp_files_removed_when_a_later_file_fails(files, tmp_path):
+    before = set(glob.glob(os.path.join(tempfile.gettempdir(), '*.gz')))
+    with pytest.raises(OSError):
+        StreamingMultipartEncoder({}, [files[0], str(tmp_path / 'missing.png')], compress_pdf=True)
+    assert set(glob.glob(os.path.join(tempfile.gettempdir(), '*.gz'))) == before
+
+
+def test_progress_is_throttled(files):
+    calls = []
+    encoder = StreamingMultipartEncoder({}, files, progress_callback=lambda *args: calls.append(args))
+    read_all(encoder, block_size=512)
+    encoder.close()
+
+    assert 1 <= len(calls) <= 101
+    assert calls[-1][0] == calls[-1][1] == len(encoder)
@@ -0,0 +1,173 @@
+import os
+import gzip
+import time
+import uuid
+import shutil
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+GZIP_FORM_FIELD = 'file_encoding'
+
+MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.bmp': 'image/bmp',
+    '.gif': 'image/gif',
+    '.tiff': 'image/tiff',
+    '.pdf': 'application/pdf'
+}
+
+def guess_mime_type(file_path):
+    _, file_ext = os.path.splitext(file_path.lower())
+    return MIME_TYPES.get(file_ext, 'application/octet-stream')
+
+# Gzip a file to a temporary path chunk by chunk, so the compressed size is known up front
+def gzip_to_tempfile(file_path, chunk_size=CHUNK_SIZE):
+    fd, gz_path = tempfile.mkstemp(suffix='.gz')
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as gz, open(file_path, 'rb') as src:
+            shutil.copyfileobj(src, gz, chunk_size)
+    except Exception:
+        os.remove(gz_path)
+        raise
+    return gz_path
+
+
+# Same escaping urllib3 applies to multipart header parameters (HTML5 form encoding)
+def format_header_param(name, value):
+    value = value.translate({10: "%0A", 13: "%0D", 34: "%22"})
+    return f'{name}="{value}"'
+
+
+class StreamingMultipartEncoder:
+    """
+    File-like multipart/form-data body that reads uploaded files in chunks on demand.
+
+    `requests` streams any object exposing `read()` and `__len__`, so only one chunk
+    per file is held in memory instead of the whole multi-file body. The optional
+    `progress_callback(bytes_sent, total_bytes, elapsed_seconds)` fires at most once per
+    PROGRESS_INTERVAL seconds and PROGRESS_STEP of the body, plus once at the end.
+
+    With `compress_pdf`, each PDF is sent as a `<name>.pdf.gz` part with Content-Type
+    `application/gzip`, and a `file_encoding=gzip` form field is added so the endpoint
+    knows to decompress. Only enable it for endpoints that accept that contract.
+    """
+
+    PROGRESS_INTERVAL = 0.1
+    PROGRESS_STEP = 0.01
+
+    def __init__(self, fields, file_paths, progress_callback=None, compress_pdf=False, chunk_size=CHUNK_SIZE):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self._temp_files = []
+        self._parts = []
+        self._chunks = None
+
+        fields = dict(fields)
+        if compress_pdf and any(guess_mime_type(p) == 'application/pdf' for p in file_paths):
+            fields[GZIP_FORM_FIELD] = 'gzip'
+
+        try:
+            for name, value in fields.items():
+                self._parts.append(self._part_header(name) + str(value).encode('utf-8') + b'\r\n')
+
+            for file_path in file_paths:
+                filename = os.path.basename(file_path)
+                mime_type = guess_mime_type(file_path)
+                upload_path = file_path
+                if compress_pdf and mime_type == 'application/pdf':
+                    upload_path = gzip_to_tempfile(file_path, chunk_size)
+                    self._temp_files.append(upload_path)
+                    filename += '.gz'
+                    mime_type = 'application/gzip'
+                self._parts.append(self._part_header('file', filename, mime_type))
+                self._parts.append(upload_path)
+                self._parts.append(b'\r\n')
+
+            self._parts.append(f'--{self.boundary}--\r\n'.encode('utf-8'))
+            self.total_bytes = sum(len(p) if isinstance(p, bytes) else os.path.getsize(p) for p in self._parts)
+        except Exception:
+            # Don't leave compressed copies of earlier files behind
+            self.close()
+            raise
+
+        self.bytes_sent = 0
+        self._buffer = bytearray()
+        self._chunks = self._iter_chunks()
+        self._start_time = None
+        self._last_report_time = 0.0
+        self._last_report_bytes = 0
+
+    def _part_header(self, name, filename=None, mime_type=None):
+        disposition = f'form-data; {format_header_param("name", name)}'
+        if filename is not None:
+            disposition += f'; {format_header_param("filename", filename)}'
+        lines = [f'--{self.boundary}', f'Content-Disposition: {disposition}']
+        if mime_type is not None:
+            lines.append(f'Content-Type: {mime_type}')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8')
+
+    def _iter_chunks(self):
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+                continue
+            with open(part, 'rb') as f:
+                while True:
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+
+    def __len__(self):
+        return self.total_bytes
+
+    def _report_progress(self):
+        now = time.time()
+        finished = self.bytes_sent >= self.total_bytes
+        step_reached = self.bytes_sent - self._last_report_bytes >= self.total_bytes * self.PROGRESS_STEP
+        # At most ~10 updates per second and ~100 per upload; each one is a websocket message
+        if not finished and not (step_reached and now - self._last_report_time >= self.PROGRESS_INTERVAL):
+            return
+        self._last_report_time = now
+        self._last_report_bytes = self.bytes_sent
+        self.progress_callback(self.bytes_sent, self.total_bytes, now - self._start_time)
+
+    def read(self, size=-1):
+        if self._start_time is None:
+            self._start_time = time.time()
+
+        while size is None or size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer.extend(chunk)
+
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+
+        self.bytes_sent += len(data)
+        if self.progress_callback and data:
+            self._report_progress()
+        return data
+
+    def close(self):
+        if self._chunks is not None:
+            self._chunks.close()
+        for temp_file in self._temp_files:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+        self._temp_files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()